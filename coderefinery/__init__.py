@@ -7,7 +7,10 @@ __version__ = "1.0.0"
 __author__ = "CodeRefinery Team"
 
 from .analyzer import CodeAnalyzer
-from .models import AnalysisResult, FileAnalysis, StyleIssue, ComplexityMetric, BugReport
+from .models import (
+    AnalysisResult, FileAnalysis, StyleIssue, ComplexityMetric, ComplexityReport, BugReport,
+    SourceSummary, FunctionInfo, MethodInfo, ClassInfo, ImportInfo, FromImportInfo
+)
 
 __all__ = [
     "CodeAnalyzer",
@@ -15,5 +18,12 @@ __all__ = [
     "FileAnalysis",
     "StyleIssue",
     "ComplexityMetric", 
-    "BugReport"
+    "ComplexityReport",
+    "BugReport",
+    "SourceSummary",
+    "FunctionInfo",
+    "MethodInfo",
+    "ClassInfo",
+    "ImportInfo",
+    "FromImportInfo"
 ]
\ No newline at end of file
@@ -2,36 +2,405 @@
 Core code analysis engine for CodeRefinery.
 """
 import ast
+import copy
+import difflib
+import functools
+import hashlib
+import multiprocessing
+import os
+import pickle
 import re
 import subprocess
 import tempfile
-from typing import List, Dict, Tuple, Optional, Set, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Tuple, Optional, Set, Any, Callable, Iterator, Union, cast
 from pathlib import Path
 import json
 
 from .models import (
     AnalysisResult, FileAnalysis, StyleIssue, ComplexityMetric, 
-    BugReport, OverallMetrics, Severity
+    ComplexityReport, BugReport, OverallMetrics, Severity
 )
 
+# Below this many files the process pool startup costs more than it saves.
+PARALLEL_MIN_FILES = 4
+
+# Pool workers are never forked: the web app analyzes from one thread of a
+# multithreaded server, and a child forked while another thread holds a
+# lock can deadlock.
+_POOL_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# What each pool worker receives: path, content, apply_black, the file's
+# precomputed tool output, tools_available and max_complexity_threshold
+_WorkerPayload = Tuple[str, str, bool, Dict[str, Any], Dict[str, bool], int]
+
+# In-process cache of per-file results, keyed by CodeAnalyzer._cache_key
+ANALYSIS_CACHE_SIZE = 256
+
+# Part of every cache key; bump when FileAnalysis gains or loses fields so
+# results pickled by an older version are not loaded
+_CACHE_FORMAT = 3
+
+# Either a parsed module or the SyntaxError raised while parsing it
+_ParseResult = Tuple[Optional[ast.Module], Optional[SyntaxError]]
+_ANALYSIS_CACHE: "OrderedDict[str, FileAnalysis]" = OrderedDict()
+# Guards _ANALYSIS_CACHE; Streamlit runs each session on its own thread
+_ANALYSIS_CACHE_LOCK = threading.Lock()
+
+# Files are written as file_<index>.py for the batched tool runs so output
+# lines can be mapped back to their input file.
+_BULK_FILE_RE = re.compile(r'file_(\d+)\.py')
+
+# Hunk header of a unified diff, e.g. '@@ -12,7 +12,8 @@'
+_HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@')
+
+# First line of a function or class definition, as used for snippets
+_SNIPPET_START_RE = re.compile(r'^[^\S\n]*(?:def|class) [^\n]*\S', re.M)
+
+# Suggestions and severities for flake8 issue codes
+_STYLE_SUGGESTIONS = {
+    "E501": "break line into multiple lines or increase line length limit",
+    "E225": "add spaces around operators",
+    "E231": "add space after comma",
+    "E241": "use single space after comma",
+    "W291": "remove trailing whitespace",
+    "E111": "use 4-space indentation",
+    "E301": "add blank line before function/class definition"
+}
+_STYLE_HIGH = frozenset({"E901", "E999"})  # Syntax errors
+_STYLE_LOW = frozenset({"W291", "W292", "W293"})  # Whitespace issues
+
+# Patterns for the heuristic style checks. They run over the whole file at
+# once, so none of them may match across a newline.
+_RE_LONG_LINE = re.compile(r'^.{80,}$', re.M)
+_RE_MULTI_SPACE_COMMA = re.compile(r',[^\S\n]{2,}')
+# Equivalent to \w[=+\-*/]\w, but anchoring on the rarer operator character
+# first lets the regex engine skip most positions.
+_RE_MISSING_OP_SPACE = re.compile(r'[=+\-*/](?<=\w[=+\-*/])\w')
+# Anchored on the newline, which is far rarer than spaces; a lone
+# [ \t]$ makes the engine try every space in the file. The unterminated
+# last line is checked separately.
+_RE_TRAILING_WHITESPACE = re.compile(r'\n(?<=[ \t]\n)')
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_tools() -> Dict[str, Optional[str]]:
+    """
+    Return the version of each code quality tool, or None if it is unavailable.
+    
+    Probed once per process; every CodeAnalyzer shares the result.
+    """
+    tools: Dict[str, Optional[str]] = {}
+    for tool in ['flake8', 'black', 'radon']:
+        try:
+            result = subprocess.run(
+                [tool, '--version'], capture_output=True, check=True, text=True
+            )
+            tools[tool] = result.stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            tools[tool] = None
+    return tools
+
+
+def _available_cpus() -> int:
+    """Number of CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _bulk_tmp_root() -> Optional[str]:
+    """
+    Parent directory for the batched tool runs' temp files.
+    
+    The files only live for the length of the tool runs, so a memory-backed
+    /dev/shm is preferred when writable; otherwise the default temp
+    directory is used.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK | os.X_OK):
+        return '/dev/shm'
+    return None
+
+
+def _write_bulk_files(tmpdir: str, encoded: List[bytes]) -> List[str]:
+    """Write each encoded file to ``tmpdir/file_<index>.py`` and return the paths."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    file_paths = []
+    for index, data in enumerate(encoded):
+        file_path = os.path.join(tmpdir, f"file_{index}.py")
+        fd = os.open(file_path, flags, 0o600)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def _stream_lines(cmd: List[str], input: Optional[str] = None) -> Iterator[str]:
+    """
+    Run ``cmd`` and yield its stdout line by line as it is produced.
+    
+    ``input`` is written to the process's stdin first. Trailing newlines are
+    stripped and blank lines skipped; stderr is discarded.
+    """
+    with subprocess.Popen(
+        cmd, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+    ) as proc:
+        assert proc.stdout is not None
+        if input is not None:
+            assert proc.stdin is not None
+            try:
+                proc.stdin.write(input)
+            finally:
+                proc.stdin.close()
+        for line in proc.stdout:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line
+
+
+def _line_end(content: str, start: int, count: int) -> int:
+    """Offset of the newline ending the ``count``-th line from ``start``, or the end of ``content``."""
+    if count <= 0:
+        return start
+    end = start - 1
+    for _ in range(count):
+        end = content.find('\n', end + 1)
+        if end == -1:
+            return len(content)
+    return end
+
+
+def _unified_diff(a: List[str], b: List[str], fromfile: str, tofile: str,
+                  context: int = 3) -> str:
+    """
+    Unified diff of two line lists.
+    
+    Reformatting usually touches a small region of a file, so the identical
+    leading and trailing lines are trimmed (keeping ``context`` lines of
+    each) before ``difflib`` matches the rest; hunk headers are shifted back
+    to the original line numbers.
+    """
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    
+    lo = max(prefix - context, 0)
+    trim = max(suffix - context, 0)
+    diff = difflib.unified_diff(
+        a[lo:len(a) - trim], b[lo:len(b) - trim],
+        fromfile=fromfile, tofile=tofile, n=context
+    )
+    if not lo:
+        return ''.join(diff)
+    
+    def shift(match: "re.Match[str]") -> str:
+        return (f"@@ -{int(match.group(1)) + lo}{match.group(2) or ''} "
+                f"+{int(match.group(3)) + lo}{match.group(4) or ''} @@")
+    
+    return ''.join(
+        _HUNK_HEADER_RE.sub(shift, line, count=1) if line.startswith('@@') else line
+        for line in diff
+    )
+
+
+class _CCNVisitor(ast.NodeVisitor):
+    """Count the decision points of a function in one traversal."""
+    
+    def __init__(self) -> None:
+        self.count = 0
+    
+    def visit_branch(self, node: ast.AST) -> None:
+        self.count += 1
+        self.generic_visit(node)
+    
+    visit_If = visit_While = visit_For = visit_AsyncFor = visit_branch
+    visit_ExceptHandler = visit_branch
+    
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        self.count += len(node.values) - 1
+        self.generic_visit(node)
+    
+    def visit_comprehension_node(
+        self, node: Union[ast.ListComp, ast.DictComp, ast.SetComp, ast.GeneratorExp]
+    ) -> None:
+        for generator in node.generators:
+            self.count += 1 + len(generator.ifs)
+        self.generic_visit(node)
+    
+    visit_ListComp = visit_DictComp = visit_SetComp = visit_comprehension_node
+    visit_GeneratorExp = visit_comprehension_node
+
+
+class _BugVisitor(ast.NodeVisitor):
+    """Collect every AST-based bug pattern in a single traversal."""
+    
+    DANGEROUS_CALLS = frozenset({"eval", "exec", "compile", "__import__"})
+    
+    def __init__(self) -> None:
+        self.mutable_defaults: List[BugReport] = []
+        self.bare_excepts: List[BugReport] = []
+        self.dangerous_calls: List[BugReport] = []
+        self.assigned: List[Tuple[str, int]] = []
+        self.used: Set[str] = set()
+        # One entry per enclosing class or function: True while directly in a class body
+        self.in_class: List[bool] = []
+    
+    def _visit_scope(self, node: ast.AST, in_class: bool) -> None:
+        self.in_class.append(in_class)
+        self.generic_visit(node)
+        self.in_class.pop()
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        # Class-level assignments are fields and attributes, not variables
+        self._visit_scope(node, True)
+    
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self._visit_scope(node, False)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        for arg in node.args.defaults:
+            if isinstance(arg, (ast.List, ast.Dict, ast.Set)):
+                self.mutable_defaults.append(BugReport(
+                    line=node.lineno,
+                    message="Dangerous default value {} (mutable default argument)".format(
+                        "[]" if isinstance(arg, ast.List) else "{}" if isinstance(arg, ast.Dict) else "set()"
+                    ),
+                    severity=Severity.HIGH,
+                    category="mutable_default"
+                ))
+        self._visit_scope(node, False)
+    
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is None:
+            self.bare_excepts.append(BugReport(
+                line=node.lineno,
+                message="Bare except clause - catches all exceptions including KeyboardInterrupt",
+                severity=Severity.MEDIUM,
+                category="exception_handling"
+            ))
+        self.generic_visit(node)
+    
+    def _in_class_body(self) -> bool:
+        return bool(self.in_class) and self.in_class[-1]
+    
+    def visit_Assign(self, node: ast.Assign) -> None:
+        for target in node.targets:
+            if isinstance(target, ast.Name) and not self._in_class_body():
+                self.assigned.append((target.id, node.lineno))
+        self.generic_visit(node)
+    
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        # A bare annotation (e.g. a dataclass field) declares, not assigns
+        if (node.value is not None and isinstance(node.target, ast.Name)
+                and not self._in_class_body()):
+            self.assigned.append((node.target.id, node.lineno))
+        self.generic_visit(node)
+    
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        # 'total += 1' reads the current value
+        if isinstance(node.target, ast.Name):
+            self.used.add(node.target.id)
+        self.generic_visit(node)
+    
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        # Class attributes and module globals are read as 'Config.debug'
+        self.used.add(node.attr)
+        self.generic_visit(node)
+    
+    def visit_Name(self, node: ast.Name) -> None:
+        if not isinstance(node.ctx, ast.Store):
+            self.used.add(node.id)
+    
+    def unused_variables(self) -> List[BugReport]:
+        """Report simple assignments whose name is never read anywhere."""
+        return [
+            BugReport(
+                line=lineno,
+                message=f"Variable '{name}' assigned but never used",
+                severity=Severity.LOW,
+                category="unused_variable"
+            )
+            for name, lineno in self.assigned
+            if name not in self.used and name.islower() and name not in ('_', '__')
+        ]
+    
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Name) and node.func.id in self.DANGEROUS_CALLS:
+            self.dangerous_calls.append(BugReport(
+                line=node.lineno,
+                message=f"Use of {node.func.id}() is dangerous and should be avoided",
+                severity=Severity.HIGH,
+                category="security"
+            ))
+        self.generic_visit(node)
+
+
+def _match_lines(content: str, pattern: "re.Pattern[str]") -> Iterator[Tuple[int, "re.Match[str]"]]:
+    """Yield (line number, first match) for each line of ``content`` matching ``pattern``."""
+    line_no, counted = 1, 0
+    match = pattern.search(content)
+    while match:
+        line_no += content.count('\n', counted, match.start())
+        yield line_no, match
+        
+        # Resume the search at the start of the next line
+        counted = content.find('\n', match.start())
+        if counted == -1:
+            return
+        line_no += 1
+        counted += 1
+        match = pattern.search(content, counted)
+
+
+@functools.lru_cache(maxsize=8)
+def _worker_analyzer(tools_available: Tuple[Tuple[str, bool], ...],
+                     max_complexity_threshold: int) -> "CodeAnalyzer":
+    """Analyzer for a pool worker, built from the parent's settings without probing the tools."""
+    analyzer = CodeAnalyzer.__new__(CodeAnalyzer)
+    analyzer.max_complexity_threshold = max_complexity_threshold
+    analyzer.cache_dir = None
+    analyzer.tool_versions = {}
+    analyzer.tools_available = dict(tools_available)
+    return analyzer
+
+
+def _analyze_file_worker(payload: _WorkerPayload) -> FileAnalysis:
+    """Process-pool entry point: analyze one file from plain, picklable fields."""
+    path, content, apply_black, tool_output, tools_available, max_complexity_threshold = payload
+    analyzer = _worker_analyzer(tuple(sorted(tools_available.items())), max_complexity_threshold)
+    return analyzer._analyze_single_file(path, content, apply_black, tool_output)
+
 
 class CodeAnalyzer:
     """Main code analysis engine."""
     
-    def __init__(self, max_complexity_threshold: int = 10):
+    def __init__(self, max_complexity_threshold: int = 10, cache_dir: Optional[str] = None):
+        """
+        Args:
+            max_complexity_threshold: CCN above which a function is a violation
+            cache_dir: Optional directory for persisting per-file results
+                between runs; results are always cached in-process
+        """
         self.max_complexity_threshold = max_complexity_threshold
-        self.tools_available = self._check_tool_availability()
-    
-    def _check_tool_availability(self) -> Dict[str, bool]:
-        """Check which code quality tools are available."""
-        tools = {}
-        for tool in ['flake8', 'black', 'radon']:
-            try:
-                subprocess.run([tool, '--version'], capture_output=True, check=True)
-                tools[tool] = True
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                tools[tool] = False
-        return tools
+        self.cache_dir = cache_dir
+        self.tool_versions = dict(_detect_tools())
+        self.tools_available = {
+            tool: version is not None for tool, version in self.tool_versions.items()
+        }
     
     def analyze_files(self, files: List[Dict[str, str]], options: Dict = None) -> AnalysisResult:
         """
@@ -48,22 +417,50 @@ class CodeAnalyzer:
         if 'max_complexity_threshold' in options:
             self.max_complexity_threshold = options['max_complexity_threshold']
         
-        analyzed_files = []
+        apply_black = options.get('apply_black', False)
+        python_files = [f for f in files if f.get('language') == 'python']
+        # Encoded once, for both the cache keys and the tools' temp files
+        encoded = [f['content'].encode('utf-8') for f in python_files]
+        cache_keys = [
+            self._cache_key(f['path'], data, apply_black)
+            for f, data in zip(python_files, encoded)
+        ]
+        analyzed_files = [self._cache_get(key) for key in cache_keys]
+        
+        # Only files without a cached result go through the tools
+        misses = [i for i, cached in enumerate(analyzed_files) if cached is None]
+        tool_outputs = self._bulk_run_tools(
+            [python_files[i]['content'] for i in misses], apply_black,
+            encoded=[encoded[i] for i in misses]
+        )
+        payloads = [
+            (python_files[i]['path'], python_files[i]['content'], apply_black, tool_output)
+            for i, tool_output in zip(misses, tool_outputs)
+        ]
+        
+        for i, file_analysis in zip(misses, self._run_file_analyses(payloads)):
+            self._cache_put(cache_keys[i], file_analysis)
+            analyzed_files[i] = file_analysis
+        
+        # Every miss has been filled in above
+        return self.summarize_files(cast(List[FileAnalysis], analyzed_files), options)
+    
+    def summarize_files(self, analyzed_files: List[FileAnalysis], options: Optional[Dict] = None) -> AnalysisResult:
+        """
+        Combine already analyzed files into an overall analysis result.
+        
+        Args:
+            analyzed_files: Per-file results, e.g. from earlier analyze_files calls
+            options: Analysis options; only export_formats is used here
+        """
+        if options is None:
+            options = {}
+        
         total_issues = 0
         high_severity_count = 0
         complexity_violations = 0
         
-        for file_data in files:
-            if file_data.get('language') != 'python':
-                continue
-                
-            file_analysis = self._analyze_single_file(
-                file_data['path'], 
-                file_data['content'],
-                options.get('apply_black', False)
-            )
-            
-            analyzed_files.append(file_analysis)
+        for file_analysis in analyzed_files:
             total_issues += len(file_analysis.style_issues) + len(file_analysis.bugs)
             high_severity_count += sum(1 for issue in file_analysis.style_issues 
                                      if issue.severity == Severity.HIGH)
@@ -71,7 +468,7 @@ class CodeAnalyzer:
                                      if bug.severity == Severity.HIGH)
             
             # Count complexity violations
-            for metric in file_analysis.complexity.get('function_metrics', []):
+            for metric in file_analysis.complexity.function_metrics:
                 if metric.get('ccn', 0) > self.max_complexity_threshold:
                     complexity_violations += 1
         
@@ -97,22 +494,226 @@ class CodeAnalyzer:
         
         return result
     
-    def _analyze_single_file(self, path: str, content: str, apply_black: bool = False) -> FileAnalysis:
-        """Analyze a single Python file."""
+    def _cache_key(self, path: str, data: bytes, apply_black: bool) -> str:
+        """Key a file's analysis by its UTF-8 content, options and the tools that produce it."""
+        digest = hashlib.blake2b(data, digest_size=16)
+        tools = sorted(
+            (tool, self.tool_versions.get(tool) if available else None)
+            for tool, available in self.tools_available.items()
+        )
+        digest.update(repr((_CACHE_FORMAT, path, apply_black, tools)).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[FileAnalysis]:
+        """Return a copy of a cached file analysis, checking memory then disk."""
+        with _ANALYSIS_CACHE_LOCK:
+            cached = _ANALYSIS_CACHE.get(key)
+            if cached is not None:
+                _ANALYSIS_CACHE.move_to_end(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        if self.cache_dir:
+            try:
+                with open(os.path.join(self.cache_dir, f"{key}.pkl"), 'rb') as f:
+                    cached = pickle.load(f)
+            except Exception:
+                return None
+            if isinstance(cached, FileAnalysis):
+                self._remember(key, cached)
+                return copy.deepcopy(cached)
+        
+        return None
+    
+    def _cache_put(self, key: str, file_analysis: FileAnalysis) -> None:
+        """Store a file analysis in memory and, if configured, on disk."""
+        self._remember(key, copy.deepcopy(file_analysis))
+        
+        if self.cache_dir:
+            tmp_name = None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+                    tmp_name = f.name
+                    pickle.dump(file_analysis, f)
+                os.replace(tmp_name, os.path.join(self.cache_dir, f"{key}.pkl"))
+            except Exception:
+                # The disk cache is best effort; don't leave partial files behind
+                if tmp_name is not None:
+                    try:
+                        os.unlink(tmp_name)
+                    except OSError:
+                        pass
+    
+    def _remember(self, key: str, file_analysis: FileAnalysis) -> None:
+        """Add an entry to the in-process cache, evicting the least recently used."""
+        with _ANALYSIS_CACHE_LOCK:
+            _ANALYSIS_CACHE[key] = file_analysis
+            _ANALYSIS_CACHE.move_to_end(key)
+            while len(_ANALYSIS_CACHE) > ANALYSIS_CACHE_SIZE:
+                _ANALYSIS_CACHE.popitem(last=False)
+    
+    def _run_file_analyses(self, payloads: List[Tuple[str, str, bool, Dict[str, Any]]]) -> List[FileAnalysis]:
+        """
+        Analyze (path, content, apply_black, tool_output) payloads in input order.
+        
+        Larger batches use a process pool when more than one CPU is
+        available; workers get the analyzer's settings as plain fields.
+        """
+        cpus = _available_cpus()
+        if len(payloads) >= PARALLEL_MIN_FILES and cpus > 1:
+            worker_payloads = [
+                payload + (self.tools_available, self.max_complexity_threshold)
+                for payload in payloads
+            ]
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(cpus, len(payloads)),
+                    mp_context=multiprocessing.get_context(_POOL_START_METHOD)
+                ) as executor:
+                    return list(executor.map(_analyze_file_worker, worker_payloads, chunksize=4))
+            except (OSError, BrokenProcessPool):
+                # Process creation can be unavailable (sandboxes, some
+                # platforms); the serial path produces identical results.
+                pass
+        
+        return [
+            self._analyze_single_file(path, content, apply_black, tool_output)
+            for path, content, apply_black, tool_output in payloads
+        ]
+    
+    def _bulk_run_tools(self, contents: List[str], apply_black: bool = False,
+                        encoded: Optional[List[bytes]] = None) -> List[Dict[str, Any]]:
+        """
+        Run each available external tool once over all files.
+        
+        Every file is written to a shared temporary directory, then flake8,
+        black and radon are each invoked a single time on that directory.
+        ``encoded`` may supply the contents already encoded as UTF-8.
+        Returns one dict per input file holding the parsed output of each
+        tool that ran ('flake8', 'black', 'radon'); a missing key means the
+        per-file analysis should fall back to its usual path.
+        """
+        tool_outputs: List[Dict[str, Any]] = [{} for _ in contents]
+        if not contents or not any(self.tools_available.values()):
+            return tool_outputs
+        
+        try:
+            with tempfile.TemporaryDirectory(dir=_bulk_tmp_root()) as tmpdir:
+                if encoded is None:
+                    encoded = [content.encode('utf-8') for content in contents]
+                file_paths = _write_bulk_files(tmpdir, encoded)
+                
+                if self.tools_available.get('flake8', False):
+                    self._bulk_run_flake8(tmpdir, tool_outputs)
+                if self.tools_available.get('radon', False):
+                    self._bulk_run_radon(tmpdir, tool_outputs)
+                # black last: with apply_black it rewrites the files in place
+                if self.tools_available.get('black', False):
+                    self._bulk_run_black(tmpdir, file_paths, contents, apply_black, tool_outputs)
+        except Exception:
+            # Per-file analysis still works without the batched results
+            return [{} for _ in contents]
+        
+        return tool_outputs
+    
+    def _bulk_run_flake8(self, tmpdir: str, tool_outputs: List[Dict[str, Any]]) -> None:
+        """Run flake8 once over the temp directory and split issues per file."""
+        for tool_output in tool_outputs:
+            tool_output['flake8'] = []
+        
+        known: Dict[str, Tuple[str, Severity]] = {}
+        output = _stream_lines(
+            ['flake8', '--format=%(path)s:%(row)d:%(col)d:%(code)s:%(text)s', tmpdir]
+        )
+        for line in output:
+            match = _BULK_FILE_RE.search(line)
+            if not match:
+                continue
+            parts = line[match.end() + 1:].split(':', 3)
+            if len(parts) >= 4:
+                row, col, code, message = parts
+                tool_outputs[int(match.group(1))]['flake8'].append(
+                    self._make_style_issue(int(row), code, message, known)
+                )
+    
+    def _bulk_run_black(self, tmpdir: str, file_paths: List[str], contents: List[str],
+                        apply_black: bool, tool_outputs: List[Dict[str, Any]]) -> None:
+        """Run black once over the temp directory and record which files it changes."""
+        result = subprocess.run(
+            ['black', '--diff', tmpdir],
+            capture_output=True, text=True
+        )
+        
+        changed = set()
+        for line in result.stdout.split('\n'):
+            if line.startswith('+++ ') and tmpdir in line:
+                match = _BULK_FILE_RE.search(line)
+                if match:
+                    changed.add(int(match.group(1)))
+        
+        if apply_black and changed:
+            # Unparsable files make black exit non-zero; the others are still formatted
+            subprocess.run(['black', '--quiet', tmpdir], capture_output=True)
+        
+        for index, content in enumerate(contents):
+            formatted_content = content
+            formatting_issues = []
+            if index in changed:
+                formatting_issues.append(self._black_formatting_issue())
+                if apply_black:
+                    with open(file_paths[index], 'r', encoding='utf-8') as f:
+                        formatted_content = f.read()
+            tool_outputs[index]['black'] = (formatted_content, formatting_issues)
+    
+    def _bulk_run_radon(self, tmpdir: str, tool_outputs: List[Dict[str, Any]]) -> None:
+        """Run radon once over the temp directory and split metrics per file."""
+        result = subprocess.run(
+            ['radon', 'cc', '--json', tmpdir],
+            capture_output=True, text=True
+        )
+        if not result.stdout:
+            return
+        
+        for file_name, blocks in json.loads(result.stdout).items():
+            match = _BULK_FILE_RE.search(file_name)
+            # radon reports unparsable files as {"error": ...}
+            if match and isinstance(blocks, list):
+                tool_outputs[int(match.group(1))]['radon'] = self._radon_complexity(blocks)
+    
+    def _analyze_single_file(self, path: str, content: str, apply_black: bool = False,
+                             tool_output: Optional[Dict[str, Any]] = None) -> FileAnalysis:
+        """
+        Analyze a single Python file.
+        
+        ``tool_output`` holds precomputed results from ``_bulk_run_tools``;
+        any tool missing from it is run for this file alone.
+        """
+        if tool_output is None:
+            tool_output = {}
         file_analysis = FileAnalysis(path=path, language="python")
+        lines = content.split('\n')
+        parsed = self._parse(content)
         
-        # Step 1: Style analysis
-        file_analysis.style_issues = self._analyze_style(content)
+        # Steps 1-3: style, formatting and complexity, reusing any
+        # precomputed tool output
+        pending: Dict[str, Tuple[Callable[..., Any], Tuple[Any, ...]]] = {}
+        if 'flake8' not in tool_output:
+            pending['flake8'] = (self._analyze_style, (content,))
+        if 'black' not in tool_output:
+            pending['black'] = (self._analyze_formatting, (content, apply_black, lines))
+        if 'radon' not in tool_output:
+            pending['radon'] = (self._analyze_complexity, (content, parsed))
+        outputs = dict(tool_output)
+        outputs.update(self._run_tool_steps(pending))
         
-        # Step 2: Formatting analysis
-        formatted_content, formatting_issues = self._analyze_formatting(content, apply_black)
+        file_analysis.style_issues = list(outputs['flake8'])
+        formatted_content, formatting_issues = outputs['black']
         file_analysis.style_issues.extend(formatting_issues)
-        
-        # Step 3: Complexity measurement
-        file_analysis.complexity = self._analyze_complexity(content)
+        file_analysis.complexity = outputs['radon']
         
         # Step 4: Bug detection
-        file_analysis.bugs = self._detect_bugs(content)
+        file_analysis.bugs = self._detect_bugs(content, parsed)
         
         # Step 5: Generate before/after snippets
         file_analysis.before_snippet = self._extract_snippet(content)
@@ -124,130 +725,164 @@ class CodeAnalyzer:
         
         return file_analysis
     
+    def _run_tool_steps(self, steps: Dict[str, Tuple[Callable[..., Any], Tuple[Any, ...]]]) -> Dict[str, Any]:
+        """
+        Run the per-file analysis steps keyed by tool name.
+        
+        Steps backed by an installed tool spend their time waiting on a
+        subprocess, so when two or more of them run and there is a spare CPU
+        for the child processes they are overlapped on threads; heuristic
+        fallbacks are CPU-bound and run in turn.
+        """
+        subprocess_steps = sum(1 for tool in steps if self.tools_available.get(tool, False))
+        workers = min(len(steps), _available_cpus())
+        if subprocess_steps < 2 or workers < 2:
+            return {tool: func(*args) for tool, (func, args) in steps.items()}
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {tool: executor.submit(func, *args) for tool, (func, args) in steps.items()}
+            return {tool: future.result() for tool, future in futures.items()}
+    
+    def _parse(self, content: str) -> _ParseResult:
+        """Parse content once, returning either the tree or the syntax error."""
+        try:
+            return ast.parse(content, type_comments=False), None
+        except SyntaxError as e:
+            return None, e
+    
     def _analyze_style(self, content: str) -> List[StyleIssue]:
         """Analyze code style issues."""
         issues = []
-        lines = content.split('\n')
         
         # Use flake8 if available, otherwise heuristic analysis
         if self.tools_available.get('flake8', False):
             issues.extend(self._run_flake8(content))
         else:
-            issues.extend(self._heuristic_style_analysis(lines))
+            issues.extend(self._heuristic_style_analysis(content))
         
         return issues
     
     def _run_flake8(self, content: str) -> List[StyleIssue]:
         """Run flake8 analysis."""
         issues = []
+        known: Dict[str, Tuple[str, Severity]] = {}
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(content)
-                f.flush()
-                
-                result = subprocess.run(
-                    ['flake8', '--format=%(row)d:%(col)d:%(code)s:%(text)s', f.name],
-                    capture_output=True, text=True
-                )
-                
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        parts = line.split(':', 3)
-                        if len(parts) >= 4:
-                            row, col, code, message = parts
-                            issues.append(StyleIssue(
-                                line=int(row),
-                                code=code,
-                                message=message.strip(),
-                                suggestion=self._get_style_suggestion(code),
-                                severity=self._get_style_severity(code)
-                            ))
+            output = _stream_lines(
+                ['flake8', '--format=%(row)d:%(col)d:%(code)s:%(text)s', '-'], content
+            )
+            for line in output:
+                parts = line.split(':', 3)
+                if len(parts) >= 4:
+                    row, col, code, message = parts
+                    issues.append(self._make_style_issue(int(row), code, message, known))
         except Exception as e:
             # Fallback to heuristic analysis
-            return self._heuristic_style_analysis(content.split('\n'))
+            return self._heuristic_style_analysis(content)
         
         return issues
     
-    def _heuristic_style_analysis(self, lines: List[str]) -> List[StyleIssue]:
-        """Perform heuristic style analysis when flake8 is not available."""
-        issues = []
+    def _make_style_issue(self, row: int, code: str, message: str,
+                          known: Dict[str, Tuple[str, Severity]]) -> StyleIssue:
+        """
+        Build a StyleIssue from one line of flake8 output.
         
-        for i, line in enumerate(lines, 1):
-            # Check line length
-            if len(line) > 79:
-                issues.append(StyleIssue(
-                    line=i,
-                    code="E501",
-                    message=f"line too long ({len(line)} > 79 characters)",
-                    suggestion="break line into multiple lines"
-                ))
-            
-            # Check for multiple spaces after comma
-            if re.search(r',\s{2,}', line):
-                issues.append(StyleIssue(
-                    line=i,
-                    code="E241",
-                    message="multiple spaces after ','",
-                    suggestion="use single space after comma"
-                ))
-            
-            # Check for missing spaces around operators
-            if re.search(r'\w[=+\-*/]\w', line) and 'def ' not in line:
-                issues.append(StyleIssue(
-                    line=i,
+        ``known`` caches the suggestion and severity per issue code for the
+        duration of one flake8 run, since the same few codes repeat.
+        """
+        info = known.get(code)
+        if info is None:
+            info = known[code] = (self._get_style_suggestion(code), self._get_style_severity(code))
+        return StyleIssue(
+            line=row,
+            code=code,
+            message=message.strip(),
+            suggestion=info[0],
+            severity=info[1]
+        )
+    
+    def _heuristic_style_analysis(self, content: str) -> List[StyleIssue]:
+        """
+        Perform heuristic style analysis when flake8 is not available.
+        
+        Each check is a regex search over the whole file that skips to the
+        next line after a hit, rather than a Python loop over every line.
+        Issues are reported at most once per line and rule, ordered by line.
+        """
+        found = []  # (line, rule order, issue)
+        
+        # Check line length
+        for line_no, match in _match_lines(content, _RE_LONG_LINE):
+            length = match.end() - match.start()
+            found.append((line_no, 0, StyleIssue(
+                line=line_no,
+                code="E501",
+                message=f"line too long ({length} > 79 characters)",
+                suggestion="break line into multiple lines"
+            )))
+        
+        # Check for multiple spaces after comma
+        for line_no, match in _match_lines(content, _RE_MULTI_SPACE_COMMA):
+            found.append((line_no, 1, StyleIssue(
+                line=line_no,
+                code="E241",
+                message="multiple spaces after ','",
+                suggestion="use single space after comma"
+            )))
+        
+        # Check for missing spaces around operators (keyword defaults in
+        # function signatures are exempt)
+        for line_no, match in _match_lines(content, _RE_MISSING_OP_SPACE):
+            line_start = content.rfind('\n', 0, match.start()) + 1
+            line_end = content.find('\n', match.end())
+            if content.find('def ', line_start, line_end if line_end != -1 else len(content)) == -1:
+                found.append((line_no, 2, StyleIssue(
+                    line=line_no,
                     code="E225",
                     message="missing whitespace around operator",
                     suggestion="add spaces around operators"
-                ))
-            
-            # Check for trailing whitespace
-            if line.endswith(' ') or line.endswith('\t'):
-                issues.append(StyleIssue(
-                    line=i,
-                    code="W291",
-                    message="trailing whitespace",
-                    suggestion="remove trailing whitespace"
-                ))
+                )))
         
-        return issues
+        # Check for trailing whitespace
+        trailing = [line_no for line_no, _ in _match_lines(content, _RE_TRAILING_WHITESPACE)]
+        if content.endswith((' ', '\t')):
+            trailing.append(content.count('\n') + 1)
+        for line_no in trailing:
+            found.append((line_no, 3, StyleIssue(
+                line=line_no,
+                code="W291",
+                message="trailing whitespace",
+                suggestion="remove trailing whitespace"
+            )))
+        
+        found.sort(key=lambda item: item[:2])
+        return [issue for _, _, issue in found]
     
-    def _analyze_formatting(self, content: str, apply_black: bool) -> Tuple[str, List[StyleIssue]]:
+    def _analyze_formatting(self, content: str, apply_black: bool,
+                            lines: Optional[List[str]] = None) -> Tuple[str, List[StyleIssue]]:
         """Analyze code formatting with black."""
         formatting_issues = []
         formatted_content = content
         
         if self.tools_available.get('black', False):
             try:
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    f.write(content)
-                    f.flush()
-                    
-                    # Check what black would change
-                    result = subprocess.run(
-                        ['black', '--diff', f.name],
-                        capture_output=True, text=True
-                    )
+                # black reformats stdin to stdout; exit code 123 means it could not parse
+                result = subprocess.run(
+                    ['black', '--quiet', '-'],
+                    input=content, capture_output=True, text=True
+                )
+                
+                if result.returncode == 0 and result.stdout != content:
+                    formatting_issues.append(self._black_formatting_issue())
                     
-                    if result.stdout and result.stdout.strip():
-                        formatting_issues.append(StyleIssue(
-                            line=1,
-                            code="BLACK",
-                            message="code formatting can be improved",
-                            suggestion="run black formatter",
-                            severity=Severity.LOW
-                        ))
-                        
-                        if apply_black:
-                            # Apply black formatting
-                            subprocess.run(['black', f.name], check=True)
-                            with open(f.name, 'r') as formatted_f:
-                                formatted_content = formatted_f.read()
+                    if apply_black:
+                        formatted_content = result.stdout
                                 
             except Exception:
                 pass
         else:
             # Heuristic formatting analysis
-            lines = content.split('\n')
+            if lines is None:
+                lines = content.split('\n')
             for i, line in enumerate(lines, 1):
                 if line.strip() and (line.startswith(' ') and not line.startswith('    ')):
                     if not any(line.startswith(' ' * j) for j in [2, 6, 8]):
@@ -260,51 +895,64 @@ class CodeAnalyzer:
         
         return formatted_content, formatting_issues
     
-    def _analyze_complexity(self, content: str) -> Dict:
-        """Analyze code complexity."""
-        complexity_data = {
-            "function_metrics": [],
-            "avg_ccn": 0.0
-        }
+    def _black_formatting_issue(self) -> StyleIssue:
+        """Issue reported when black would reformat a file."""
+        return StyleIssue(
+            line=1,
+            code="BLACK",
+            message="code formatting can be improved",
+            suggestion="run black formatter",
+            severity=Severity.LOW
+        )
+    
+    def _analyze_complexity(self, content: str,
+                            parsed: Optional[_ParseResult] = None) -> ComplexityReport:
+        """Analyze code complexity; ``parsed`` is a result of ``_parse`` to reuse."""
+        complexity_data = ComplexityReport()
         
         if self.tools_available.get('radon', False):
             try:
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    f.write(content)
-                    f.flush()
-                    
-                    result = subprocess.run(
-                        ['radon', 'cc', '--json', f.name],
-                        capture_output=True, text=True
-                    )
-                    
-                    if result.stdout:
-                        radon_data = json.loads(result.stdout)
-                        for file_data in radon_data.values():
-                            for func_data in file_data:
-                                complexity_data["function_metrics"].append({
-                                    "name": func_data["name"],
-                                    "ccn": func_data["complexity"],
-                                    "lineno": func_data["lineno"]
-                                })
+                result = subprocess.run(
+                    ['radon', 'cc', '--json', '-'],
+                    input=content, capture_output=True, text=True
+                )
+                
+                if result.stdout:
+                    radon_data = json.loads(result.stdout)
+                    for file_data in radon_data.values():
+                        complexity_data = self._radon_complexity(file_data)
                         
-                        if complexity_data["function_metrics"]:
-                            avg_ccn = sum(m["ccn"] for m in complexity_data["function_metrics"]) / len(complexity_data["function_metrics"])
-                            complexity_data["avg_ccn"] = round(avg_ccn, 2)
-                            
             except Exception:
-                complexity_data = self._heuristic_complexity_analysis(content)
+                complexity_data = self._heuristic_complexity_analysis(content, parsed)
         else:
-            complexity_data = self._heuristic_complexity_analysis(content)
+            complexity_data = self._heuristic_complexity_analysis(content, parsed)
         
         return complexity_data
     
-    def _heuristic_complexity_analysis(self, content: str) -> Dict:
+    def _radon_complexity(self, blocks: List[Dict[str, Any]]) -> ComplexityReport:
+        """Convert radon's JSON blocks for one file into complexity data."""
+        function_metrics = [
+            {
+                "name": func_data["name"],
+                "ccn": func_data["complexity"],
+                "lineno": func_data["lineno"]
+            }
+            for func_data in blocks
+        ]
+        
+        avg_ccn = 0.0
+        if function_metrics:
+            avg_ccn = sum(m["ccn"] for m in function_metrics) / len(function_metrics)
+            avg_ccn = round(avg_ccn, 2)
+        
+        return ComplexityReport(function_metrics=function_metrics, avg_ccn=avg_ccn)
+    
+    def _heuristic_complexity_analysis(self, content: str,
+                                       parsed: Optional[_ParseResult] = None) -> ComplexityReport:
         """Perform heuristic complexity analysis when radon is not available."""
-        try:
-            tree = ast.parse(content)
-        except SyntaxError:
-            return {"function_metrics": [], "avg_ccn": 0.0}
+        tree, _ = parsed if parsed is not None else self._parse(content)
+        if tree is None:
+            return ComplexityReport()
         
         function_metrics = []
         
@@ -332,169 +980,68 @@ class CodeAnalyzer:
             avg_ccn = sum(m["ccn"] for m in function_metrics) / len(function_metrics)
             avg_ccn = round(avg_ccn, 2)
         
-        return {
-            "function_metrics": function_metrics,
-            "avg_ccn": avg_ccn
-        }
+        return ComplexityReport(function_metrics=function_metrics, avg_ccn=avg_ccn)
     
     def _calculate_ccn(self, node: ast.FunctionDef) -> int:
         """Calculate cyclomatic complexity for a function."""
-        complexity = 1  # Base complexity
-        
-        for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.AsyncFor)):
-                complexity += 1
-            elif isinstance(child, (ast.ExceptHandler,)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-            elif isinstance(child, (ast.ListComp, ast.DictComp, ast.SetComp, ast.GeneratorExp)):
-                for generator in child.generators:
-                    complexity += 1
-                    complexity += len(generator.ifs)
-        
-        return complexity
-    
-    def _detect_bugs(self, content: str) -> List[BugReport]:
-        """Detect potential bugs and unsafe patterns."""
+        visitor = _CCNVisitor()
+        visitor.visit(node)
+        return 1 + visitor.count  # Base complexity plus decision points
+    
+    def _detect_bugs(self, content: str,
+                     parsed: Optional[_ParseResult] = None) -> List[BugReport]:
+        """Detect potential bugs and unsafe patterns; ``parsed`` is a result of ``_parse`` to reuse."""
         bugs = []
         
-        try:
-            tree = ast.parse(content)
-        except SyntaxError as e:
+        tree, syntax_error = parsed if parsed is not None else self._parse(content)
+        if tree is None:
+            assert syntax_error is not None  # _parse returns exactly one of the two
             bugs.append(BugReport(
-                line=e.lineno or 1,
-                message=f"Syntax error: {e.msg}",
+                line=syntax_error.lineno or 1,
+                message=f"Syntax error: {syntax_error.msg}",
                 severity=Severity.HIGH,
                 category="syntax"
             ))
             return bugs
         
         # Check for common bug patterns
-        bugs.extend(self._check_mutable_defaults(tree))
-        bugs.extend(self._check_bare_except(tree))
-        bugs.extend(self._check_unused_variables(tree, content))
-        bugs.extend(self._check_security_issues(tree, content))
-        
-        return bugs
-    
-    def _check_mutable_defaults(self, tree: ast.AST) -> List[BugReport]:
-        """Check for mutable default arguments."""
-        bugs = []
-        
-        class MutableDefaultVisitor(ast.NodeVisitor):
-            def visit_FunctionDef(self, node):
-                for arg in node.args.defaults:
-                    if isinstance(arg, (ast.List, ast.Dict, ast.Set)):
-                        bugs.append(BugReport(
-                            line=node.lineno,
-                            message="Dangerous default value {} (mutable default argument)".format(
-                                "[]" if isinstance(arg, ast.List) else "{}" if isinstance(arg, ast.Dict) else "set()"
-                            ),
-                            severity=Severity.HIGH,
-                            category="mutable_default"
-                        ))
-                self.generic_visit(node)
-        
-        visitor = MutableDefaultVisitor()
-        visitor.visit(tree)
-        return bugs
-    
-    def _check_bare_except(self, tree: ast.AST) -> List[BugReport]:
-        """Check for bare except clauses."""
-        bugs = []
-        
-        class BareExceptVisitor(ast.NodeVisitor):
-            def visit_ExceptHandler(self, node):
-                if node.type is None:
-                    bugs.append(BugReport(
-                        line=node.lineno,
-                        message="Bare except clause - catches all exceptions including KeyboardInterrupt",
-                        severity=Severity.MEDIUM,
-                        category="exception_handling"
-                    ))
-                self.generic_visit(node)
-        
-        visitor = BareExceptVisitor()
+        visitor = _BugVisitor()
         visitor.visit(tree)
-        return bugs
-    
-    def _check_unused_variables(self, tree: ast.AST, content: str) -> List[BugReport]:
-        """Check for unused variables (simplified)."""
-        bugs = []
-        lines = content.split('\n')
-        
-        # Simple regex-based check for obvious unused variables
-        for i, line in enumerate(lines, 1):
-            if '=' in line and not line.strip().startswith('#'):
-                # Look for simple assignments
-                match = re.match(r'\s*(\w+)\s*=', line)
-                if match:
-                    var_name = match.group(1)
-                    if var_name not in ['_', '__'] and var_name.islower():
-                        # Check if variable is used later (simple check)
-                        remaining_content = '\n'.join(lines[i:])
-                        if var_name not in remaining_content:
-                            bugs.append(BugReport(
-                                line=i,
-                                message=f"Variable '{var_name}' assigned but never used",
-                                severity=Severity.LOW,
-                                category="unused_variable"
-                            ))
-        
-        return bugs
-    
-    def _check_security_issues(self, tree: ast.AST, content: str) -> List[BugReport]:
-        """Check for basic security issues."""
-        bugs = []
-        
-        # Check for eval/exec usage
-        if 'eval(' in content:
-            line_num = next((i+1 for i, line in enumerate(content.split('\n')) if 'eval(' in line), 1)
-            bugs.append(BugReport(
-                line=line_num,
-                message="Use of eval() is dangerous and should be avoided",
-                severity=Severity.HIGH,
-                category="security"
-            ))
-        
-        if 'exec(' in content:
-            line_num = next((i+1 for i, line in enumerate(content.split('\n')) if 'exec(' in line), 1)
-            bugs.append(BugReport(
-                line=line_num,
-                message="Use of exec() is dangerous and should be avoided",
-                severity=Severity.HIGH,
-                category="security"
-            ))
+        bugs.extend(visitor.mutable_defaults)
+        bugs.extend(visitor.bare_excepts)
+        bugs.extend(visitor.unused_variables())
+        bugs.extend(visitor.dangerous_calls)
         
         return bugs
     
     def _extract_snippet(self, content: str, max_lines: int = 20) -> str:
-        """Extract a representative snippet from the content."""
-        lines = content.split('\n')
-        if len(lines) <= max_lines:
+        """
+        Extract a representative snippet from the content.
+        
+        Works on newline offsets rather than a list of every line, stopping
+        at the first function or class definition.
+        """
+        if _line_end(content, 0, max_lines) == len(content):
             return content
         
         # Try to get a meaningful snippet
-        for i, line in enumerate(lines):
-            if line.strip().startswith('def ') or line.strip().startswith('class '):
-                end_idx = min(i + max_lines, len(lines))
-                return '\n'.join(lines[i:end_idx])
+        match = _SNIPPET_START_RE.search(content)
+        if match:
+            start = content.rfind('\n', 0, match.start()) + 1
+            return content[start:_line_end(content, start, max_lines)]
         
         # Fallback to first N lines
-        return '\n'.join(lines[:max_lines])
+        return content[:_line_end(content, 0, max_lines)]
     
     def _generate_patch(self, original: str, modified: str, path: str) -> str:
         """Generate unified diff patch."""
         try:
-            import difflib
-            diff = difflib.unified_diff(
+            return _unified_diff(
                 original.splitlines(keepends=True),
                 modified.splitlines(keepends=True),
-                fromfile=f"a/{path}",
-                tofile=f"b/{path}"
+                f"a/{path}",
+                f"b/{path}"
             )
-            return ''.join(diff)
         except Exception:
             return None
     
@@ -525,25 +1072,13 @@ class CodeAnalyzer:
     
     def _get_style_suggestion(self, code: str) -> str:
         """Get suggestion for style issue code."""
-        suggestions = {
-            "E501": "break line into multiple lines or increase line length limit",
-            "E225": "add spaces around operators",
-            "E231": "add space after comma",
-            "E241": "use single space after comma",
-            "W291": "remove trailing whitespace",
-            "E111": "use 4-space indentation",
-            "E301": "add blank line before function/class definition"
-        }
-        return suggestions.get(code, "refer to PEP8 style guide")
+        return _STYLE_SUGGESTIONS.get(code, "refer to PEP8 style guide")
     
     def _get_style_severity(self, code: str) -> Severity:
         """Get severity level for style issue code."""
-        high_severity = {"E901", "E999"}  # Syntax errors
-        low_severity = {"W291", "W292", "W293"}  # Whitespace issues
-        
-        if code in high_severity:
+        if code in _STYLE_HIGH:
             return Severity.HIGH
-        elif code in low_severity:
+        elif code in _STYLE_LOW:
             return Severity.LOW
         else:
             return Severity.MEDIUM
@@ -557,6 +1092,7 @@ class CodeAnalyzer:
         
         if "json" in formats:
             exports["json"] = self._serialize_result(result)
+            result._json_export_files = tuple(result.files)
         
         return exports
     
@@ -586,12 +1122,12 @@ class CodeAnalyzer:
                 for bug in file_analysis.bugs:
                     md_lines.append(f"- Line {bug.line}: {bug.message} [{bug.severity.value}]")
             
-            complexity_metrics = file_analysis.complexity.get('function_metrics', [])
+            complexity_metrics = file_analysis.complexity.function_metrics
             if complexity_metrics:
                 md_lines.append(f"\n### Complexity Metrics")
                 for metric in complexity_metrics:
                     md_lines.append(f"- {metric['name']} (line {metric['lineno']}): CCN = {metric['ccn']}")
-                md_lines.append(f"- Average CCN: {file_analysis.complexity.get('avg_ccn', 0)}")
+                md_lines.append(f"- Average CCN: {file_analysis.complexity.avg_ccn}")
             
             md_lines.append("")
         
@@ -601,41 +1137,59 @@ class CodeAnalyzer:
         return "\n".join(md_lines)
     
     def _serialize_result(self, result: AnalysisResult) -> Dict:
-        """Convert result to JSON-serializable format."""
+        """
+        Convert result to JSON-serializable format.
+        
+        File entries already built for the JSON export are reused rather
+        than serialized a second time, as long as the result still holds
+        the same file analyses the export was built from.
+        """
+        exported = result.export.get("json")
+        source = result._json_export_files
+        if (exported is not None and source is not None and len(source) == len(result.files)
+                and all(a is b for a, b in zip(source, result.files))):
+            files = list(exported["files"])
+        else:
+            files = [self._serialize_file(f) for f in result.files]
+        
         return {
             "summary": result.summary,
-            "files": [
-                {
-                    "path": f.path,
-                    "language": f.language,
-                    "style_issues": [
-                        {
-                            "line": issue.line,
-                            "code": issue.code,
-                            "message": issue.message,
-                            "suggestion": issue.suggestion
-                        }
-                        for issue in f.style_issues
-                    ],
-                    "complexity": f.complexity,
-                    "bugs": [
-                        {
-                            "line": bug.line,
-                            "message": bug.message,
-                            "severity": bug.severity.value
-                        }
-                        for bug in f.bugs
-                    ],
-                    "before_snippet": f.before_snippet,
-                    "after_snippet": f.after_snippet,
-                    "patch": f.patch
-                }
-                for f in result.files
-            ],
+            "files": files,
             "overall_metrics": {
                 "total_issues": result.overall_metrics.total_issues,
                 "high_severity": result.overall_metrics.high_severity,
                 "files_analyzed": result.overall_metrics.files_analyzed
             },
             "export": result.export
-        }
\ No newline at end of file
+        }
+    
+    def _serialize_file(self, f: FileAnalysis) -> Dict:
+        """Convert one file analysis to JSON-serializable format."""
+        return {
+            "path": f.path,
+            "language": f.language,
+            "style_issues": [
+                {
+                    "line": issue.line,
+                    "code": issue.code,
+                    "message": issue.message,
+                    "suggestion": issue.suggestion
+                }
+                for issue in f.style_issues
+            ],
+            "complexity": {
+                "function_metrics": f.complexity.function_metrics,
+                "avg_ccn": f.complexity.avg_ccn
+            },
+            "bugs": [
+                {
+                    "line": bug.line,
+                    "message": bug.message,
+                    "severity": bug.severity.value
+                }
+                for bug in f.bugs
+            ],
+            "before_snippet": f.before_snippet,
+            "after_snippet": f.after_snippet,
+            "patch": f.patch
+        }
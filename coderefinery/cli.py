@@ -3,39 +3,105 @@
 Command-line interface for CodeRefinery.
 """
 import argparse
+import codecs
 import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, TextIO, Tuple
 
 from coderefinery.analyzer import CodeAnalyzer
-from coderefinery.models import AnalysisResult
+from coderefinery.models import AnalysisResult, Severity
+from coderefinery.utils import dump_json
+
+# Fixed pieces of the human-readable report
+_REPORT_HEADER = "\n".join(["=" * 60, "CodeRefinery Analysis Report", "=" * 60, ""])
+_SECTION_RULE = "-" * 20
+_SEVERITY_LABELS = {severity: severity.value.upper() for severity in Severity}
+
+
+def _read_source(path_str: str) -> str:
+    """
+    Read a source file as UTF-8 text with universal newlines.
+    
+    Reads the raw file with a single fstat-sized os.read instead of going
+    through the buffered text I/O stack and decodes the whole blob at once.
+    Newline handling matches ``open(path, 'r', encoding='utf-8')``; a leading
+    UTF-8 BOM is dropped, since ``ast.parse`` rejects it in text.
+    """
+    flags = os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0) | getattr(os, 'O_BINARY', 0)
+    fd = os.open(path_str, flags)
+    try:
+        size = os.fstat(fd).st_size
+        # One byte more than expected shows whether the file grew since fstat
+        data = os.read(fd, size + 1)
+        if len(data) > size:
+            chunks = [data]
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b''.join(chunks)
+    finally:
+        os.close(fd)
+    
+    if data.startswith(codecs.BOM_UTF8):
+        content = data.decode('utf-8-sig')
+    else:
+        content = data.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+def _load_one(path_str: str) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Load one file, returning either its file dict or a warning to report.
+    
+    A missing Python file is detected by the open failing rather than by a
+    separate stat beforehand.
+    """
+    path = Path(path_str)
+    if path.suffix != '.py':
+        if not path.exists():
+            return None, f"Warning: File {path_str} not found"
+        return None, f"Warning: Skipping non-Python file {path_str}"
+    
+    try:
+        content = _read_source(path_str)
+    except FileNotFoundError:
+        return None, f"Warning: File {path_str} not found"
+    except Exception as e:
+        return None, f"Error reading {path_str}: {e}"
+    
+    return {
+        "path": str(path),
+        "language": "python",
+        "content": content
+    }, None
 
 
 def load_files_from_paths(file_paths: List[str]) -> List[Dict[str, str]]:
-    """Load files from file paths."""
+    """
+    Load files from file paths.
+    
+    Several paths are read concurrently on a thread pool; results and
+    warnings are still reported in input order.
+    """
+    if len(file_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(32, len(file_paths))) as executor:
+            loaded = list(executor.map(_load_one, file_paths))
+    else:
+        loaded = [_load_one(path_str) for path_str in file_paths]
+    
     files = []
-    for path_str in file_paths:
-        path = Path(path_str)
-        if not path.exists():
-            print(f"Warning: File {path_str} not found", file=sys.stderr)
-            continue
-        
-        if path.suffix != '.py':
-            print(f"Warning: Skipping non-Python file {path_str}", file=sys.stderr)
-            continue
-        
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            files.append({
-                "path": str(path),
-                "language": "python",
-                "content": content
-            })
-        except Exception as e:
-            print(f"Error reading {path_str}: {e}", file=sys.stderr)
+    for file_data, warning in loaded:
+        if warning:
+            print(warning, file=sys.stderr)
+        elif file_data is not None:
+            files.append(file_data)
     
     return files
 
@@ -76,6 +142,9 @@ Examples:
     
     # Export reports
     coderefinery analyze --export markdown,json app.py
+    
+    # Reuse results for unchanged files across runs
+    coderefinery analyze --cache-dir .coderefinery_cache app.py
         """
     )
     
@@ -93,6 +162,8 @@ Examples:
     analyze_parser.add_argument('--output', '-o', help='Output file for results')
     analyze_parser.add_argument('--format', choices=['human', 'json'], default='human',
                                help='Output format')
+    analyze_parser.add_argument('--cache-dir',
+                               help='Directory for caching results of unchanged files between runs')
     
     # Version command
     version_parser = subparsers.add_parser('version', help='Show version')
@@ -128,112 +199,129 @@ Examples:
             sys.exit(1)
         
         # Perform analysis
-        analyzer = CodeAnalyzer(max_complexity_threshold=options.get('max_complexity_threshold', 10))
+        analyzer = CodeAnalyzer(
+            max_complexity_threshold=options.get('max_complexity_threshold', 10),
+            cache_dir=args.cache_dir
+        )
         result = analyzer.analyze_files(files, options)
         
-        # Output results
+        # Output results; the text report is streamed rather than joined
         if args.format == 'json':
-            output = json.dumps(analyzer._serialize_result(result), indent=2)
-        else:
-            output = generate_human_readable_output(result)
+            output = dump_json(analyzer._serialize_result(result))
         
         if args.output:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                f.write(output)
+            with open(args.output, 'w', encoding='utf-8', buffering=128 * 1024) as f:
+                if args.format == 'json':
+                    f.write(output)
+                else:
+                    _write_report(f, result)
             print(f"Results written to {args.output}")
-        else:
+        elif args.format == 'json':
             print(output)
+        else:
+            _write_report(sys.stdout, result)
+            sys.stdout.write("\n")
     
     else:
         parser.print_help()
 
 
-def generate_human_readable_output(result: AnalysisResult) -> str:
-    """Generate human-readable output."""
-    lines = []
+def iter_report_lines(result: AnalysisResult) -> Iterator[str]:
+    """
+    Yield the human-readable report line by line, without line endings.
     
+    An entry may span several lines by containing newlines itself.
+    """
     # Header
-    lines.append("=" * 60)
-    lines.append("CodeRefinery Analysis Report")
-    lines.append("=" * 60)
-    lines.append("")
+    yield _REPORT_HEADER
     
     # Summary
-    lines.append("SUMMARY")
-    lines.append("-" * 20)
-    lines.append(result.summary)
-    lines.append("")
+    yield "SUMMARY"
+    yield _SECTION_RULE
+    yield result.summary
+    yield ""
     
     # Overall metrics
-    lines.append("METRICS")
-    lines.append("-" * 20)
-    lines.append(f"Files analyzed: {result.overall_metrics.files_analyzed}")
-    lines.append(f"Total issues: {result.overall_metrics.total_issues}")
-    lines.append(f"High severity: {result.overall_metrics.high_severity}")
-    lines.append(f"Complexity violations: {result.overall_metrics.complexity_violations}")
-    lines.append("")
+    metrics = result.overall_metrics
+    yield "METRICS"
+    yield _SECTION_RULE
+    yield (f"Files analyzed: {metrics.files_analyzed}\n"
+           f"Total issues: {metrics.total_issues}\n"
+           f"High severity: {metrics.high_severity}\n"
+           f"Complexity violations: {metrics.complexity_violations}\n")
     
     # File details
     for i, file_analysis in enumerate(result.files, 1):
-        lines.append(f"FILE {i}: {file_analysis.path}")
-        lines.append("-" * (len(file_analysis.path) + 10))
+        yield f"FILE {i}: {file_analysis.path}"
+        yield "-" * (len(file_analysis.path) + 10)
         
         # Style issues
         if file_analysis.style_issues:
-            lines.append("Style Issues:")
+            yield "Style Issues:"
             for issue in file_analysis.style_issues:
-                lines.append(f"  Line {issue.line:3d}: [{issue.code}] {issue.message}")
-                lines.append(f"           Suggestion: {issue.suggestion}")
+                yield (f"  Line {issue.line:3d}: [{issue.code}] {issue.message}\n"
+                       f"           Suggestion: {issue.suggestion}")
         
         # Bugs
         if file_analysis.bugs:
-            lines.append("Potential Bugs:")
+            yield "Potential Bugs:"
             for bug in file_analysis.bugs:
-                lines.append(f"  Line {bug.line:3d}: [{bug.severity.value.upper()}] {bug.message}")
+                yield f"  Line {bug.line:3d}: [{_SEVERITY_LABELS[bug.severity]}] {bug.message}"
         
         # Complexity
-        complexity_metrics = file_analysis.complexity.get('function_metrics', [])
+        complexity_metrics = file_analysis.complexity.function_metrics
         if complexity_metrics:
-            lines.append("Complexity Metrics:")
+            yield "Complexity Metrics:"
             for metric in complexity_metrics:
                 ccn_indicator = " ⚠️" if metric['ccn'] > 10 else ""
-                lines.append(f"  {metric['name']:20s} (line {metric['lineno']:3d}): CCN = {metric['ccn']}{ccn_indicator}")
-            lines.append(f"  Average CCN: {file_analysis.complexity.get('avg_ccn', 0):.1f}")
+                yield f"  {metric['name']:20s} (line {metric['lineno']:3d}): CCN = {metric['ccn']}{ccn_indicator}"
+            yield f"  Average CCN: {file_analysis.complexity.avg_ccn:.1f}"
         
         # Snippets
-        if file_analysis.after_snippet != file_analysis.before_snippet:
-            lines.append("")
-            lines.append("Suggested Changes:")
-            lines.append("  Before:")
-            for line in file_analysis.before_snippet.split('\n')[:10]:
-                lines.append(f"    {line}")
-            if len(file_analysis.before_snippet.split('\n')) > 10:
-                lines.append("    ...")
+        if file_analysis.has_changes:
+            before_lines = file_analysis.before_snippet.split('\n')
+            after_lines = file_analysis.after_snippet.split('\n')
+            yield "\nSuggested Changes:\n  Before:"
+            yield from (f"    {line}" for line in before_lines[:10])
+            if len(before_lines) > 10:
+                yield "    ..."
             
-            lines.append("  After:")
-            for line in file_analysis.after_snippet.split('\n')[:10]:
-                lines.append(f"    {line}")
-            if len(file_analysis.after_snippet.split('\n')) > 10:
-                lines.append("    ...")
+            yield "  After:"
+            yield from (f"    {line}" for line in after_lines[:10])
+            if len(after_lines) > 10:
+                yield "    ..."
         
-        lines.append("")
+        yield ""
     
     # Tool status
     if result.tool_status != "all tools available":
-        lines.append("TOOL STATUS")
-        lines.append("-" * 20)
-        lines.append(result.tool_status)
-        lines.append("")
+        yield "TOOL STATUS"
+        yield _SECTION_RULE
+        yield result.tool_status
+        yield ""
     
     # Export info
     if result.export:
-        lines.append("EXPORTS")
-        lines.append("-" * 20)
+        yield "EXPORTS"
+        yield _SECTION_RULE
         for format_name in result.export.keys():
-            lines.append(f"- {format_name.upper()} report generated")
-        lines.append("")
-    
-    return "\n".join(lines)
+            yield f"- {format_name.upper()} report generated"
+        yield ""
+
+
+def generate_human_readable_output(result: AnalysisResult) -> str:
+    """Generate human-readable output."""
+    return "\n".join(iter_report_lines(result))
+
+
+def _write_report(stream: TextIO, result: AnalysisResult) -> None:
+    """Write the human-readable report to ``stream`` as it is generated."""
+    lines = iter_report_lines(result)
+    first = next(lines, None)
+    if first is None:
+        return
+    stream.write(first)
+    stream.writelines("\n" + line for line in lines)
 
 
 if __name__ == '__main__':
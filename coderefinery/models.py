@@ -1,10 +1,14 @@
 """
 Data models for CodeRefinery analysis results.
 """
+import sys
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, ClassVar
 from enum import Enum
 
+# Slotted dataclasses drop the per-instance __dict__; slots= needs Python 3.10
+_DATACLASS_OPTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 class Severity(Enum):
     LOW = "low"
@@ -12,7 +16,7 @@ class Severity(Enum):
     HIGH = "high"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
 class StyleIssue:
     line: int
     code: str
@@ -21,7 +25,7 @@ class StyleIssue:
     severity: Severity = Severity.MEDIUM
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
 class ComplexityMetric:
     name: str
     ccn: int
@@ -29,7 +33,13 @@ class ComplexityMetric:
     type: str = "function"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
+class ComplexityReport:
+    function_metrics: List[Dict[str, Any]] = field(default_factory=list)
+    avg_ccn: float = 0.0
+
+
+@dataclass(**_DATACLASS_OPTS)
 class BugReport:
     line: int
     message: str
@@ -37,26 +47,24 @@ class BugReport:
     category: str = "general"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
 class FileAnalysis:
     path: str
     language: str
     style_issues: List[StyleIssue] = field(default_factory=list)
-    complexity: Dict[str, Any] = field(default_factory=dict)
+    complexity: ComplexityReport = field(default_factory=ComplexityReport)
     bugs: List[BugReport] = field(default_factory=list)
     before_snippet: str = ""
     after_snippet: str = ""
     patch: Optional[str] = None
     
-    def __post_init__(self):
-        if not self.complexity:
-            self.complexity = {
-                "function_metrics": [],
-                "avg_ccn": 0.0
-            }
+    @property
+    def has_changes(self) -> bool:
+        """Whether the after snippet differs from the before snippet."""
+        return self.after_snippet != self.before_snippet
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
 class OverallMetrics:
     total_issues: int
     high_severity: int
@@ -64,10 +72,76 @@ class OverallMetrics:
     complexity_violations: int = 0
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTS)
 class AnalysisResult:
     summary: str
     files: List[FileAnalysis] = field(default_factory=list)
     overall_metrics: OverallMetrics = field(default_factory=lambda: OverallMetrics(0, 0, 0))
     export: Dict[str, Any] = field(default_factory=dict)
-    tool_status: str = "all tools available"
\ No newline at end of file
+    tool_status: str = "all tools available"
+    # The file analyses export["json"] was serialized from, if any
+    _json_export_files: Optional[Tuple[FileAnalysis, ...]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+
+class _Record:
+    """Read-only record that also supports ``record['field']`` lookups."""
+    
+    __slots__ = ()
+    # Set on each subclass by @dataclass
+    __dataclass_fields__: ClassVar[Dict[str, Any]]
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTS)
+class FunctionInfo(_Record):
+    name: str
+    lineno: int
+    args: Tuple[str, ...]
+    docstring: Optional[str]
+    is_async: bool
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTS)
+class MethodInfo(_Record):
+    name: str
+    lineno: int
+    is_async: bool
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTS)
+class ClassInfo(_Record):
+    name: str
+    lineno: int
+    bases: Tuple[str, ...]
+    methods: Tuple[MethodInfo, ...]
+    docstring: Optional[str]
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTS)
+class ImportInfo(_Record):
+    module: str
+    alias: Optional[str]
+    lineno: int
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTS)
+class FromImportInfo(_Record):
+    module: str
+    name: str
+    alias: Optional[str]
+    lineno: int
+    level: int
+
+
+@dataclass(**_DATACLASS_OPTS)
+class SourceSummary:
+    functions: List[FunctionInfo] = field(default_factory=list)
+    classes: List[ClassInfo] = field(default_factory=list)
+    imports: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, Any] = field(default_factory=dict)
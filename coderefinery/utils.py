@@ -3,165 +3,290 @@ Utility functions for CodeRefinery.
 """
 import re
 import ast
-from typing import List, Dict, Tuple, Optional
+import functools
+import inspect
+import json
+from typing import Any, Callable, List, Dict, Tuple, Optional, TypeVar, Union
 
+from .models import (
+    ClassInfo, FromImportInfo, FunctionInfo, ImportInfo, MethodInfo, SourceSummary
+)
 
-def extract_functions(content: str) -> List[Dict[str, any]]:
-    """Extract function definitions from Python code."""
+try:
+    import orjson
+except ImportError:  # optional, only makes JSON handling faster
+    orjson = None  # type: ignore[assignment]
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_cached(content: str) -> Tuple[Optional[ast.Module], Optional[SyntaxError]]:
+    """
+    Parse content once for all the helpers in this module.
+    
+    Returns the tree, or None and the SyntaxError. The tree is shared
+    between callers and must not be modified.
+    """
     try:
-        tree = ast.parse(content)
-    except SyntaxError:
-        return []
+        return ast.parse(content), None
+    except SyntaxError as e:
+        return None, e.with_traceback(None)
+
+
+def clear_parse_cache() -> None:
+    """Drop the parsed trees, extraction results and scores kept for recently analyzed content."""
+    _parse_cached.cache_clear()
+    _extract_all.cache_clear()
+    calculate_maintainability_index.cache_clear()
+
+
+# ast.unparse only exists on Python 3.9+; older versions report 'Unknown' bases
+_unparse = getattr(ast, 'unparse', lambda node: 'Unknown')
+
+# Function node types, mapped to their 'is_async' flag
+_FUNC_TYPES = {ast.FunctionDef: False, ast.AsyncFunctionDef: True}
+
+# Definitions and imports are statements, and statements only ever sit in
+# lists of these node types (bodies, except handlers, match cases)
+_STMT_CONTAINERS = (ast.stmt, ast.excepthandler) + (
+    (ast.match_case,) if hasattr(ast, 'match_case') else ()
+)
+
+# Node types that can carry a docstring as their first statement
+_DefNode = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef]
+
+
+def _docstring(node: _DefNode) -> Optional[str]:
+    """
+    Return a definition's cleaned docstring, like ast.get_docstring.
+    
+    Most definitions have none, and the inline probe settles that without
+    get_docstring's node-type checks.
+    """
+    body = node.body
+    if body and type(body[0]) is ast.Expr:
+        value = body[0].value
+        if type(value) is ast.Constant and type(value.value) is str:
+            return inspect.cleandoc(value.value)
+    return None
+
+
+class _ExtractVisitor:
+    """Collect functions, classes and imports in a single walk of the tree."""
     
-    functions = []
+    def __init__(self) -> None:
+        self.functions: List[FunctionInfo] = []
+        self.classes: List[ClassInfo] = []
+        self.imports: List[ImportInfo] = []
+        self.from_imports: List[FromImportInfo] = []
     
-    class FunctionVisitor(ast.NodeVisitor):
-        def visit_FunctionDef(self, node):
-            functions.append({
-                'name': node.name,
-                'lineno': node.lineno,
-                'args': [arg.arg for arg in node.args.args],
-                'docstring': ast.get_docstring(node),
-                'is_async': False
-            })
-            self.generic_visit(node)
+    def visit(self, tree: ast.AST) -> None:
+        """
+        Visit the statements under ``tree`` depth-first in source order.
         
-        def visit_AsyncFunctionDef(self, node):
-            functions.append({
-                'name': node.name,
-                'lineno': node.lineno,
-                'args': [arg.arg for arg in node.args.args],
-                'docstring': ast.get_docstring(node),
-                'is_async': True
-            })
-            self.generic_visit(node)
+        Same order as ast.NodeVisitor, but iterative and without descending
+        into expressions, which cannot contain definitions or imports.
+        """
+        handlers: Dict[type, Callable[[Any], None]] = {
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.AsyncFunctionDef: self.visit_FunctionDef,
+            ast.ClassDef: self.visit_ClassDef,
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom
+        }
+        stack: List[ast.AST] = [tree]
+        while stack:
+            node = stack.pop()
+            handler = handlers.get(type(node))
+            if handler is not None:
+                handler(node)
+            for name in reversed(node._fields):
+                value = getattr(node, name, None)
+                if type(value) is list and value and isinstance(value[0], _STMT_CONTAINERS):
+                    stack.extend(reversed(value))
+    
+    def visit_FunctionDef(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> None:
+        self.functions.append(FunctionInfo(
+            name=node.name,
+            lineno=node.lineno,
+            args=tuple(arg.arg for arg in node.args.args),
+            docstring=_docstring(node),
+            is_async=_FUNC_TYPES[type(node)]
+        ))
     
-    visitor = FunctionVisitor()
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        methods: List[MethodInfo] = []
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods.append(MethodInfo(
+                    name=item.name, lineno=item.lineno, is_async=_FUNC_TYPES[type(item)]
+                ))
+        
+        self.classes.append(ClassInfo(
+            name=node.name,
+            lineno=node.lineno,
+            bases=tuple(_unparse(base) for base in node.bases),
+            methods=tuple(methods),
+            docstring=_docstring(node)
+        ))
+    
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append(ImportInfo(module=alias.name, alias=alias.asname, lineno=node.lineno))
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = node.module or ''
+        for alias in node.names:
+            self.from_imports.append(FromImportInfo(
+                module=module,
+                name=alias.name,
+                alias=alias.asname,
+                lineno=node.lineno,
+                level=node.level
+            ))
+
+
+@functools.lru_cache(maxsize=128)
+def _extract_all(content: str) -> Optional[_ExtractVisitor]:
+    """
+    Walk the content's tree once, collecting everything the extractors report.
+    
+    Returns None on a syntax error. The records are immutable, so the public
+    extractors can share them and only copy the lists holding them.
+    """
+    tree, _ = _parse_cached(content)
+    if tree is None:
+        return None
+    
+    visitor = _ExtractVisitor()
     visitor.visit(tree)
-    return functions
+    return visitor
 
 
-def extract_classes(content: str) -> List[Dict[str, any]]:
-    """Extract class definitions from Python code."""
-    try:
-        tree = ast.parse(content)
-    except SyntaxError:
+def extract_functions(content: str) -> List[FunctionInfo]:
+    """Extract function definitions from Python code."""
+    if 'def' not in content:  # every function definition spells out the keyword
+        return []
+    extracted = _extract_all(content)
+    if extracted is None:
         return []
     
-    classes = []
-    
-    class ClassVisitor(ast.NodeVisitor):
-        def visit_ClassDef(self, node):
-            methods = []
-            for item in node.body:
-                if isinstance(item, ast.FunctionDef):
-                    methods.append({
-                        'name': item.name,
-                        'lineno': item.lineno,
-                        'is_async': False
-                    })
-                elif isinstance(item, ast.AsyncFunctionDef):
-                    methods.append({
-                        'name': item.name,
-                        'lineno': item.lineno,
-                        'is_async': True
-                    })
-            
-            classes.append({
-                'name': node.name,
-                'lineno': node.lineno,
-                'bases': [ast.unparse(base) if hasattr(ast, 'unparse') else 'Unknown' for base in node.bases],
-                'methods': methods,
-                'docstring': ast.get_docstring(node)
-            })
-            self.generic_visit(node)
+    return list(extracted.functions)
+
+
+def extract_classes(content: str) -> List[ClassInfo]:
+    """Extract class definitions from Python code."""
+    if 'class' not in content:
+        return []
+    extracted = _extract_all(content)
+    if extracted is None:
+        return []
     
-    visitor = ClassVisitor()
-    visitor.visit(tree)
-    return classes
+    return list(extracted.classes)
 
 
-def extract_imports(content: str) -> Dict[str, List[str]]:
-    """Extract import statements from Python code."""
-    try:
-        tree = ast.parse(content)
-    except SyntaxError:
-        return {'imports': [], 'from_imports': []}
-    
-    imports = []
-    from_imports = []
-    
-    class ImportVisitor(ast.NodeVisitor):
-        def visit_Import(self, node):
-            for alias in node.names:
-                imports.append({
-                    'module': alias.name,
-                    'alias': alias.asname,
-                    'lineno': node.lineno
-                })
-        
-        def visit_ImportFrom(self, node):
-            module = node.module or ''
-            for alias in node.names:
-                from_imports.append({
-                    'module': module,
-                    'name': alias.name,
-                    'alias': alias.asname,
-                    'lineno': node.lineno,
-                    'level': node.level
-                })
-    
-    visitor = ImportVisitor()
-    visitor.visit(tree)
+def extract_imports(content: str) -> Dict[str, Any]:
+    """
+    Extract import statements from Python code.
+    
+    Besides the 'imports' and 'from_imports' lists, 'from_by_module' groups
+    the from-imports by module as written, with relative imports keeping
+    their leading dots (e.g. '..parent').
+    """
+    extracted = _extract_all(content) if 'import' in content else None
+    if extracted is None:
+        return {'imports': [], 'from_imports': [], 'from_by_module': {}}
+    
+    from_by_module: Dict[str, List[FromImportInfo]] = {}
+    for imp in extracted.from_imports:
+        from_by_module.setdefault('.' * imp.level + imp.module, []).append(imp)
     
     return {
-        'imports': imports,
-        'from_imports': from_imports
+        'imports': list(extracted.imports),
+        'from_imports': list(extracted.from_imports),
+        'from_by_module': from_by_module
     }
 
 
+_T = TypeVar('_T')
+
+
+def _index_by(entries: List[_T], key: str) -> Dict[str, _T]:
+    """Index records by one of their fields, keeping the first record per value."""
+    index: Dict[str, _T] = {}
+    for entry in entries:
+        index.setdefault(getattr(entry, key), entry)
+    return index
+
+
+def extract_functions_map(content: str) -> Dict[str, FunctionInfo]:
+    """Extract function definitions keyed by name; the first definition of a name wins."""
+    return _index_by(extract_functions(content), 'name')
+
+
+def extract_classes_map(content: str) -> Dict[str, ClassInfo]:
+    """Extract class definitions keyed by name; the first definition of a name wins."""
+    return _index_by(extract_classes(content), 'name')
+
+
+def extract_imports_map(content: str) -> Dict[str, Dict[str, Any]]:
+    """Extract imports keyed by module, and from-imports keyed by imported name."""
+    imports = extract_imports(content)
+    return {
+        'imports': _index_by(imports['imports'], 'module'),
+        'from_imports': _index_by(imports['from_imports'], 'name')
+    }
+
+
+def analyze(content: str) -> SourceSummary:
+    """
+    Extract functions, classes, imports and line metrics in one call.
+    
+    The three extractors share a single parse and tree walk, so this costs
+    the same as any one of them plus the line scan.
+    """
+    return SourceSummary(
+        functions=extract_functions(content),
+        classes=extract_classes(content),
+        imports=extract_imports(content),
+        metrics=get_code_metrics(content)
+    )
+
+
 def get_code_metrics(content: str) -> Dict[str, any]:
     """Get basic code metrics."""
     lines = content.split('\n')
-    
-    metrics = {
-        'total_lines': len(lines),
-        'code_lines': 0,
-        'comment_lines': 0,
-        'blank_lines': 0,
-        'string_literals': 0
-    }
-    
-    in_multiline_string = False
+    code_lines = comment_lines = blank_lines = string_literals = 0
     multiline_delimiter = None
     
-    for line in lines:
-        stripped = line.strip()
-        
+    # Counters are locals rather than dict entries, and each line is
+    # stripped once up front; this loop runs for every line of the file.
+    for stripped in map(str.strip, lines):
         if not stripped:
-            metrics['blank_lines'] += 1
-        elif stripped.startswith('#'):
-            metrics['comment_lines'] += 1
-        else:
+            blank_lines += 1
+        elif stripped[0] == '#':
+            comment_lines += 1
+        elif multiline_delimiter is None:
             # Check for multiline strings
-            if not in_multiline_string:
-                if '"""' in line:
+            if '"""' in stripped:
+                if stripped.count('"""') < 2:
                     multiline_delimiter = '"""'
-                    in_multiline_string = True
-                    if line.count('"""') >= 2:
-                        in_multiline_string = False
-                elif "'''" in line:
+            elif "'''" in stripped:
+                if stripped.count("'''") < 2:
                     multiline_delimiter = "'''"
-                    in_multiline_string = True
-                    if line.count("'''") >= 2:
-                        in_multiline_string = False
-                else:
-                    metrics['code_lines'] += 1
             else:
-                if multiline_delimiter in line:
-                    in_multiline_string = False
-                    multiline_delimiter = None
-                metrics['string_literals'] += 1
+                code_lines += 1
+        else:
+            if multiline_delimiter in stripped:
+                multiline_delimiter = None
+            string_literals += 1
+    
+    metrics = {
+        'total_lines': len(lines),
+        'code_lines': code_lines,
+        'comment_lines': comment_lines,
+        'blank_lines': blank_lines,
+        'string_literals': string_literals
+    }
     
     if metrics['total_lines'] > 0:
         metrics['code_percentage'] = round(metrics['code_lines'] / metrics['total_lines'] * 100, 1)
@@ -175,19 +300,29 @@ def get_code_metrics(content: str) -> Dict[str, any]:
 
 def validate_python_syntax(content: str) -> Tuple[bool, Optional[str]]:
     """Validate Python syntax."""
-    try:
-        ast.parse(content)
+    _, error = _parse_cached(content)
+    if error is None:
         return True, None
-    except SyntaxError as e:
-        return False, f"Line {e.lineno}: {e.msg}"
+    return False, f"Line {error.lineno}: {error.msg}"
 
 
-def suggest_refactoring(content: str, complexity_threshold: int = 10) -> List[Dict[str, any]]:
-    """Suggest refactoring opportunities."""
+def suggest_refactoring(content: str, complexity_threshold: int = 10, *,
+                        functions: Optional[List[FunctionInfo]] = None,
+                        classes: Optional[List[ClassInfo]] = None) -> List[Dict[str, any]]:
+    """
+    Suggest refactoring opportunities.
+    
+    Callers that already extracted the functions and classes can pass them;
+    otherwise they are read from the shared extraction.
+    """
     suggestions = []
     
-    # Extract functions for analysis
-    functions = extract_functions(content)
+    if functions is None or classes is None:
+        extracted = _extract_all(content)
+        if functions is None:
+            functions = extracted.functions if extracted is not None else []
+        if classes is None:
+            classes = extracted.classes if extracted is not None else []
     
     for func in functions:
         # Suggest refactoring for long parameter lists
@@ -210,9 +345,6 @@ def suggest_refactoring(content: str, complexity_threshold: int = 10) -> List[Di
                 'severity': 'low'
             })
     
-    # Extract classes for analysis
-    classes = extract_classes(content)
-    
     for cls in classes:
         # Suggest adding docstrings to classes
         if not cls['docstring']:
@@ -234,23 +366,22 @@ def suggest_refactoring(content: str, complexity_threshold: int = 10) -> List[Di
                 'severity': 'medium'
             })
     
-    # Check for long files
-    lines = content.split('\n')
-    if len(lines) > 500:
+    # Check for long files; counting newlines matches len(content.split('\n'))
+    line_count = content.count('\n') + 1
+    if line_count > 500:
         suggestions.append({
             'type': 'file_size',
             'line': 1,
-            'message': f"File has {len(lines)} lines. Consider splitting into multiple modules.",
+            'message': f"File has {line_count} lines. Consider splitting into multiple modules.",
             'severity': 'medium'
         })
     
     return suggestions
 
 
-def generate_fix_suggestions(issue_type: str, context: Dict) -> str:
-    """Generate specific fix suggestions for different issue types."""
-    fixes = {
-        'mutable_default': """
+# Worked examples returned by generate_fix_suggestions, keyed by issue type
+_FIX_SUGGESTIONS = {
+    'mutable_default': """
 Replace mutable default argument with None and initialize inside function:
 
 Before:
@@ -265,7 +396,7 @@ def func(items=None):
     items.append(1)
     return items
 """,
-        'bare_except': """
+    'bare_except': """
 Use specific exception types instead of bare except:
 
 Before:
@@ -283,7 +414,7 @@ except Exception as e:
     logger.error(f"Unexpected error: {e}")
     raise
 """,
-        'long_line': """
+    'long_line': """
 Break long lines using parentheses or backslashes:
 
 Before:
@@ -295,7 +426,7 @@ result = some_function(
     arg4, arg5, arg6
 )
 """,
-        'missing_spaces': """
+    'missing_spaces': """
 Add spaces around operators for better readability:
 
 Before:
@@ -304,29 +435,56 @@ x=y+z*2
 After:
 x = y + z * 2
 """,
-    }
-    
-    return fixes.get(issue_type, "Refer to PEP8 style guide for best practices.")
+}
+_DEFAULT_FIX_SUGGESTION = "Refer to PEP8 style guide for best practices."
 
 
-def calculate_maintainability_index(content: str) -> float:
-    """Calculate a simple maintainability index."""
-    try:
-        tree = ast.parse(content)
-    except SyntaxError:
+def generate_fix_suggestions(issue_type: str, context: Dict) -> str:
+    """Generate specific fix suggestions for different issue types."""
+    return _FIX_SUGGESTIONS.get(issue_type, _DEFAULT_FIX_SUGGESTION)
+
+
+@functools.lru_cache(maxsize=128)
+def calculate_maintainability_index(content: str, functions_count: Optional[int] = None,
+                                    classes_count: Optional[int] = None) -> float:
+    """
+    Calculate a simple maintainability index.
+    
+    Callers that already extracted the functions and classes can pass their
+    counts; otherwise they are taken from the shared extraction. The score
+    depends only on the arguments, so repeated calls are served from a cache.
+    """
+    tree, _ = _parse_cached(content)
+    if tree is None:
         return 0.0
     
-    # Basic metrics
-    lines = content.split('\n')
-    total_lines = len([line for line in lines if line.strip()])
+    # Basic metrics, non-blank and comment lines in one pass
+    total_lines = 0
+    comment_lines = 0
+    for stripped in map(str.strip, content.split('\n')):
+        if stripped:
+            total_lines += 1
+            if stripped[0] == '#':
+                comment_lines += 1
     
     if total_lines == 0:
         return 100.0
     
     # Count various constructs
-    functions = len(extract_functions(content))
-    classes = len(extract_classes(content))
+    if functions_count is None or classes_count is None:
+        extracted = _extract_all(content)
+        assert extracted is not None  # the content parsed above
+        if functions_count is None:
+            functions_count = len(extracted.functions)
+        if classes_count is None:
+            classes_count = len(extracted.classes)
     
+    return _mi_score(total_lines, comment_lines, functions_count, classes_count)
+
+
+def _mi_score(total_lines: int, comment_lines: int, functions_count: int,
+              classes_count: int) -> float:
+    """Score already-counted constructs for calculate_maintainability_index."""
     # Simple scoring (higher is better)
     score = 100.0
     
@@ -335,13 +493,12 @@ def calculate_maintainability_index(content: str) -> float:
         score -= (total_lines - 500) / 50
     
     # Reward modular code
-    if functions > 0:
-        score += min(functions * 2, 20)
-    if classes > 0:
-        score += min(classes * 5, 25)
+    if functions_count > 0:
+        score += min(functions_count * 2, 20)
+    if classes_count > 0:
+        score += min(classes_count * 5, 25)
     
     # Check for comments
-    comment_lines = len([line for line in lines if line.strip().startswith('#')])
     comment_ratio = comment_lines / total_lines if total_lines > 0 else 0
     if comment_ratio > 0.1:
         score += 10
@@ -349,6 +506,25 @@ def calculate_maintainability_index(content: str) -> float:
     return max(0, min(100, score))
 
 
+def dump_json(data: Any) -> str:
+    """Serialize data as JSON indented by two spaces, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2)
+
+
+def load_json(text: str) -> Any:
+    """
+    Parse JSON text, using orjson when installed.
+    
+    Invalid input raises json.JSONDecodeError either way, since orjson's
+    error type subclasses it.
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format."""
     if size_bytes < 1024:
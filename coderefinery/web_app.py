@@ -8,9 +8,254 @@ import zipfile
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 from coderefinery.analyzer import CodeAnalyzer
-from coderefinery.models import Severity
+from coderefinery.models import AnalysisResult, Severity
+from coderefinery.utils import dump_json, format_file_size, load_json
+
+# Uploads above this size are rejected before they are read
+_MAX_UPLOAD_BYTES = 2 * 1024 * 1024
+
+# Severity markers shown next to each style issue and bug
+_STYLE_SEVERITY_ICON = {Severity.HIGH: "🔴", Severity.MEDIUM: "🟡", Severity.LOW: "🟢"}
+_BUG_SEVERITY_ICON = {Severity.HIGH: "🚨", Severity.MEDIUM: "⚠️", Severity.LOW: "ℹ️"}
+
+
+@st.cache_resource(show_spinner=False)
+def _get_analyzer(max_complexity: int) -> CodeAnalyzer:
+    """
+    Return the process-wide analyzer for a complexity threshold.
+    
+    The analyzer keeps no per-run state, so sessions can share it.
+    """
+    return CodeAnalyzer(max_complexity_threshold=max_complexity)
+
+
+def _analyze(files_data: List[Dict[str, str]], max_complexity: int, apply_black: bool,
+             export_formats: List[str]) -> AnalysisResult:
+    """
+    Analyze files with the shared analyzer in a single batch.
+    
+    Streamlit reruns the script on every widget interaction, and users often
+    re-submit mostly unchanged files. The analyzer's bounded per-file cache
+    is keyed by content and options but not by the complexity threshold, so
+    only new or edited files reach the tools, together in one batched run.
+    """
+    return _get_analyzer(max_complexity).analyze_files(
+        files_data, {"apply_black": apply_black, "export_formats": export_formats}
+    )
+
+
+def _build_zip(markdown: Optional[str], json_content: Optional[str], timestamp: str) -> bytes:
+    """Bundle the serialized reports into a ZIP archive."""
+    zip_buffer = BytesIO()
+    
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+        if markdown is not None:
+            zip_file.writestr(f"coderefinery_report_{timestamp}.md", markdown)
+        
+        if json_content is not None:
+            zip_file.writestr(f"coderefinery_report_{timestamp}.json", json_content)
+    
+    return zip_buffer.getvalue()
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+# st.fragment lets widgets inside a renderer rerun only that renderer; on
+# Streamlit releases without it the renderers run as part of the full script
+_fragment: Callable[[_F], _F] = (
+    getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+)
+
+
+def _store_analysis(result: AnalysisResult) -> None:
+    """
+    Keep a finished analysis and its serialized exports in session_state.
+    
+    The exports are serialized and zipped once here; reruns of the reports
+    tab only read them back.
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    markdown_text = result.export.get("markdown")
+    json_text = dump_json(result.export["json"]) if "json" in result.export else None
+    
+    st.session_state.analysis_result = result
+    st.session_state.report_timestamp = timestamp
+    st.session_state.markdown_text = markdown_text
+    st.session_state.json_text = json_text
+    st.session_state.zip_bytes = (
+        _build_zip(markdown_text, json_text, timestamp) if result.export else None
+    )
+
+
+@_fragment
+def _render_sidebar_stats() -> None:
+    """Render the quick stats of the last analysis."""
+    if 'analysis_result' in st.session_state:
+        result = st.session_state.analysis_result
+        st.metric("Files Analyzed", result.overall_metrics.files_analyzed)
+        st.metric("Total Issues", result.overall_metrics.total_issues)
+        st.metric("High Severity", result.overall_metrics.high_severity)
+        st.metric("Complexity Violations", result.overall_metrics.complexity_violations)
+
+
+@_fragment
+def _render_results_tab(max_complexity: int) -> None:
+    """Render the per-file analysis results."""
+    st.header("Analysis Results")
+    
+    if 'analysis_result' not in st.session_state:
+        st.info("👆 Please analyze some code in the 'Code Input' tab first!")
+        return
+    
+    result = st.session_state.analysis_result
+    
+    # Summary
+    st.subheader("📋 Summary")
+    st.info(result.summary)
+    
+    # Overall metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Files", result.overall_metrics.files_analyzed)
+    with col2:
+        st.metric("Total Issues", result.overall_metrics.total_issues)
+    with col3:
+        st.metric("High Severity", result.overall_metrics.high_severity)
+    with col4:
+        st.metric("Complexity Issues", result.overall_metrics.complexity_violations)
+    
+    # Tool status
+    if result.tool_status != "all tools available":
+        st.warning(f"⚠️ {result.tool_status}")
+    
+    # File-by-file analysis
+    st.subheader("📁 File Analysis")
+    warn_threshold = max_complexity * 0.7
+    
+    for i, file_analysis in enumerate(result.files):
+        with st.expander(f"📄 {file_analysis.path}", expanded=True):
+            
+            # Create tabs for different issue types
+            file_tabs = st.tabs(["🎨 Style Issues", "🐛 Bugs", "📊 Complexity", "🔧 Code Changes"])
+            
+            with file_tabs[0]:  # Style Issues
+                if file_analysis.style_issues:
+                    # One markdown element per tab instead of one per issue
+                    st.markdown("\n\n".join(
+                        f"**Line {issue.line}** "
+                        f"{_STYLE_SEVERITY_ICON.get(issue.severity, '⚪')} `{issue.code}`  \n"
+                        f"{issue.message}  \n"
+                        f"💡 *Suggestion: {issue.suggestion}*"
+                        for issue in file_analysis.style_issues
+                    ))
+                else:
+                    st.success("✅ No style issues found!")
+            
+            with file_tabs[1]:  # Bugs
+                if file_analysis.bugs:
+                    st.markdown("\n\n".join(
+                        f"**Line {bug.line}** "
+                        f"{_BUG_SEVERITY_ICON.get(bug.severity, '❓')} `{bug.severity.value.upper()}`  \n"
+                        f"{bug.message}"
+                        for bug in file_analysis.bugs
+                    ))
+                else:
+                    st.success("✅ No bugs detected!")
+            
+            with file_tabs[2]:  # Complexity
+                complexity_metrics = file_analysis.complexity.function_metrics
+                if complexity_metrics:
+                    st.markdown(f"**Average CCN:** {file_analysis.complexity.avg_ccn:.1f}")
+                    
+                    for metric in complexity_metrics:
+                        ccn = metric['ccn']
+                        if ccn > max_complexity:
+                            show, icon = st.error, "⚠️"
+                        elif ccn > warn_threshold:
+                            show, icon = st.warning, "⚡"
+                        else:
+                            show, icon = st.success, "✅"
+                        show(f"{icon} **{metric['name']}** (line {metric['lineno']}): CCN = {ccn}")
+                else:
+                    st.info("No function complexity metrics available")
+            
+            with file_tabs[3]:  # Code Changes
+                if file_analysis.has_changes:
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        st.markdown("**Before:**")
+                        st.code(file_analysis.before_snippet, language="python")
+                    
+                    with col2:
+                        st.markdown("**After:**")
+                        st.code(file_analysis.after_snippet, language="python")
+                    
+                    if file_analysis.patch:
+                        st.markdown("**Unified Diff:**")
+                        st.code(file_analysis.patch, language="diff")
+                else:
+                    st.info("No formatting changes suggested")
+
+
+@_fragment
+def _render_reports_tab() -> None:
+    """Render the report previews and download buttons."""
+    st.header("Export Reports")
+    
+    if 'analysis_result' not in st.session_state:
+        st.info("👆 Please analyze some code first!")
+        return
+    
+    # Filenames are pinned to the analysis run, not to the rerun
+    timestamp = st.session_state.report_timestamp
+    
+    markdown_content = st.session_state.markdown_text
+    json_content = st.session_state.json_text
+    zip_data = st.session_state.zip_bytes
+    
+    # Export options
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if markdown_content is not None:
+            st.subheader("📝 Markdown Report")
+            st.markdown(markdown_content)
+            
+            # Download button
+            st.download_button(
+                label="📥 Download Markdown Report",
+                data=markdown_content,
+                file_name=f"coderefinery_report_{timestamp}.md",
+                mime="text/markdown"
+            )
+    
+    with col2:
+        if json_content is not None:
+            st.subheader("🔧 JSON Report")
+            st.code(json_content, language="json")
+            
+            # Download button
+            st.download_button(
+                label="📥 Download JSON Report",
+                data=json_content,
+                file_name=f"coderefinery_report_{timestamp}.json",
+                mime="application/json"
+            )
+    
+    # Download all reports as ZIP
+    if zip_data is not None:
+        st.subheader("📦 Download All Reports")
+        
+        st.download_button(
+            label="📦 Download All Reports (ZIP)",
+            data=zip_data,
+            file_name=f"coderefinery_reports_{timestamp}.zip",
+            mime="application/zip"
+        )
 
 
 def main():
@@ -58,12 +303,7 @@ def main():
         )
         
         st.header("📊 Quick Stats")
-        if 'analysis_result' in st.session_state:
-            result = st.session_state.analysis_result
-            st.metric("Files Analyzed", result.overall_metrics.files_analyzed)
-            st.metric("Total Issues", result.overall_metrics.total_issues)
-            st.metric("High Severity", result.overall_metrics.high_severity)
-            st.metric("Complexity Violations", result.overall_metrics.complexity_violations)
+        _render_sidebar_stats()
     
     # Main content area
     tab1, tab2, tab3 = st.tabs(["📝 Code Input", "📊 Analysis Results", "📄 Reports"])
@@ -97,7 +337,7 @@ def main():
             
             with col2:
                 if st.button("🔍 Analyze Code", type="primary", use_container_width=True):
-                    if code_input.strip():
+                    if code_input and not code_input.isspace():
                         files_data = [{
                             "path": filename,
                             "language": "python", 
@@ -123,7 +363,13 @@ def main():
                 if st.button("🔍 Analyze Files", type="primary"):
                     files_data = []
                     for uploaded_file in uploaded_files:
-                        content = str(uploaded_file.read(), "utf-8")
+                        if uploaded_file.size > _MAX_UPLOAD_BYTES:
+                            st.error(
+                                f"Skipping {uploaded_file.name}: larger than "
+                                f"{format_file_size(_MAX_UPLOAD_BYTES)}"
+                            )
+                            continue
+                        content = uploaded_file.getvalue().decode("utf-8", errors="replace")
                         files_data.append({
                             "path": uploaded_file.name,
                             "language": "python",
@@ -154,7 +400,7 @@ def main():
             
             if st.button("🔍 Analyze JSON", type="primary"):
                 try:
-                    data = json.loads(json_input)
+                    data = load_json(json_input)
                     files_data = data.get('files', [])
                     
                     # Override options from JSON
@@ -173,192 +419,17 @@ def main():
         # Perform analysis if files_data is populated
         if files_data:
             with st.spinner("Analyzing code..."):
-                options = {
-                    "max_complexity_threshold": max_complexity,
-                    "apply_black": apply_black,
-                    "export_formats": export_formats
-                }
-                
-                analyzer = CodeAnalyzer(max_complexity_threshold=max_complexity)
-                result = analyzer.analyze_files(files_data, options)
-                st.session_state.analysis_result = result
-                
-                st.success("✅ Analysis complete!")
-                st.balloons()
+                result = _analyze(files_data, max_complexity, apply_black, export_formats)
+            _store_analysis(result)
+            
+            st.success("✅ Analysis complete!")
+            st.balloons()
     
     with tab2:
-        st.header("Analysis Results")
-        
-        if 'analysis_result' not in st.session_state:
-            st.info("👆 Please analyze some code in the 'Code Input' tab first!")
-            return
-        
-        result = st.session_state.analysis_result
-        
-        # Summary
-        st.subheader("📋 Summary")
-        st.info(result.summary)
-        
-        # Overall metrics
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("Files", result.overall_metrics.files_analyzed)
-        with col2:
-            st.metric("Total Issues", result.overall_metrics.total_issues)
-        with col3:
-            st.metric("High Severity", result.overall_metrics.high_severity)
-        with col4:
-            st.metric("Complexity Issues", result.overall_metrics.complexity_violations)
-        
-        # Tool status
-        if result.tool_status != "all tools available":
-            st.warning(f"⚠️ {result.tool_status}")
-        
-        # File-by-file analysis
-        st.subheader("📁 File Analysis")
-        
-        for i, file_analysis in enumerate(result.files):
-            with st.expander(f"📄 {file_analysis.path}", expanded=True):
-                
-                # Create tabs for different issue types
-                file_tabs = st.tabs(["🎨 Style Issues", "🐛 Bugs", "📊 Complexity", "🔧 Code Changes"])
-                
-                with file_tabs[0]:  # Style Issues
-                    if file_analysis.style_issues:
-                        for issue in file_analysis.style_issues:
-                            severity_color = {
-                                Severity.HIGH: "🔴",
-                                Severity.MEDIUM: "🟡", 
-                                Severity.LOW: "🟢"
-                            }.get(issue.severity, "⚪")
-                            
-                            st.markdown(f"""
-                            **Line {issue.line}** {severity_color} `{issue.code}`  
-                            {issue.message}  
-                            💡 *Suggestion: {issue.suggestion}*
-                            """)
-                    else:
-                        st.success("✅ No style issues found!")
-                
-                with file_tabs[1]:  # Bugs
-                    if file_analysis.bugs:
-                        for bug in file_analysis.bugs:
-                            severity_icon = {
-                                Severity.HIGH: "🚨",
-                                Severity.MEDIUM: "⚠️",
-                                Severity.LOW: "ℹ️"
-                            }.get(bug.severity, "❓")
-                            
-                            st.markdown(f"""
-                            **Line {bug.line}** {severity_icon} `{bug.severity.value.upper()}`  
-                            {bug.message}
-                            """)
-                    else:
-                        st.success("✅ No bugs detected!")
-                
-                with file_tabs[2]:  # Complexity
-                    complexity_metrics = file_analysis.complexity.get('function_metrics', [])
-                    if complexity_metrics:
-                        st.markdown(f"**Average CCN:** {file_analysis.complexity.get('avg_ccn', 0):.1f}")
-                        
-                        for metric in complexity_metrics:
-                            ccn = metric['ccn']
-                            if ccn > max_complexity:
-                                st.error(f"⚠️ **{metric['name']}** (line {metric['lineno']}): CCN = {ccn}")
-                            elif ccn > max_complexity * 0.7:
-                                st.warning(f"⚡ **{metric['name']}** (line {metric['lineno']}): CCN = {ccn}")
-                            else:
-                                st.success(f"✅ **{metric['name']}** (line {metric['lineno']}): CCN = {ccn}")
-                    else:
-                        st.info("No function complexity metrics available")
-                
-                with file_tabs[3]:  # Code Changes
-                    if file_analysis.after_snippet != file_analysis.before_snippet:
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown("**Before:**")
-                            st.code(file_analysis.before_snippet, language="python")
-                        
-                        with col2:
-                            st.markdown("**After:**")
-                            st.code(file_analysis.after_snippet, language="python")
-                        
-                        if file_analysis.patch:
-                            st.markdown("**Unified Diff:**")
-                            st.code(file_analysis.patch, language="diff")
-                    else:
-                        st.info("No formatting changes suggested")
+        _render_results_tab(max_complexity)
     
     with tab3:
-        st.header("Export Reports")
-        
-        if 'analysis_result' not in st.session_state:
-            st.info("👆 Please analyze some code first!")
-            return
-        
-        result = st.session_state.analysis_result
-        
-        # Export options
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if "markdown" in result.export:
-                st.subheader("📝 Markdown Report")
-                markdown_content = result.export["markdown"]
-                st.markdown(markdown_content)
-                
-                # Download button
-                st.download_button(
-                    label="📥 Download Markdown Report",
-                    data=markdown_content,
-                    file_name=f"coderefinery_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                    mime="text/markdown"
-                )
-        
-        with col2:
-            if "json" in result.export:
-                st.subheader("🔧 JSON Report")
-                json_content = json.dumps(result.export["json"], indent=2)
-                st.code(json_content, language="json")
-                
-                # Download button
-                st.download_button(
-                    label="📥 Download JSON Report",
-                    data=json_content,
-                    file_name=f"coderefinery_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
-        
-        # Download all reports as ZIP
-        if result.export:
-            st.subheader("📦 Download All Reports")
-            
-            # Create ZIP file
-            zip_buffer = BytesIO()
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                if "markdown" in result.export:
-                    zip_file.writestr(
-                        f"coderefinery_report_{timestamp}.md", 
-                        result.export["markdown"]
-                    )
-                
-                if "json" in result.export:
-                    zip_file.writestr(
-                        f"coderefinery_report_{timestamp}.json",
-                        json.dumps(result.export["json"], indent=2)
-                    )
-            
-            zip_buffer.seek(0)
-            
-            st.download_button(
-                label="📦 Download All Reports (ZIP)",
-                data=zip_buffer.getvalue(),
-                file_name=f"coderefinery_reports_{timestamp}.zip",
-                mime="application/zip"
-            )
+        _render_reports_tab()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 """
 Example scripts demonstrating CodeRefinery usage.
 """
+import sys
+
 from coderefinery.analyzer import CodeAnalyzer
 
 
@@ -68,43 +70,47 @@ class Student:
     
     result = analyzer.analyze_files(files, options)
     
-    # Print results
-    print("=" * 60)
-    print("CodeRefinery Analysis Results")
-    print("=" * 60)
-    print(f"Summary: {result.summary}")
-    print()
+    # Collect the report and write it in one go
+    lines = []
+    add = lines.append
+    add("=" * 60)
+    add("CodeRefinery Analysis Results")
+    add("=" * 60)
+    add(f"Summary: {result.summary}")
+    add("")
     
-    print("Overall Metrics:")
-    print(f"- Files analyzed: {result.overall_metrics.files_analyzed}")
-    print(f"- Total issues: {result.overall_metrics.total_issues}")
-    print(f"- High severity: {result.overall_metrics.high_severity}")
-    print(f"- Complexity violations: {result.overall_metrics.complexity_violations}")
-    print()
+    add("Overall Metrics:")
+    add(f"- Files analyzed: {result.overall_metrics.files_analyzed}")
+    add(f"- Total issues: {result.overall_metrics.total_issues}")
+    add(f"- High severity: {result.overall_metrics.high_severity}")
+    add(f"- Complexity violations: {result.overall_metrics.complexity_violations}")
+    add("")
     
     # Show file analysis
     for file_analysis in result.files:
-        print(f"File: {file_analysis.path}")
-        print("-" * 40)
+        add(f"File: {file_analysis.path}")
+        add("-" * 40)
         
         if file_analysis.style_issues:
-            print("Style Issues:")
+            add("Style Issues:")
             for issue in file_analysis.style_issues:
-                print(f"  Line {issue.line}: [{issue.code}] {issue.message}")
+                add(f"  Line {issue.line}: [{issue.code}] {issue.message}")
         
         if file_analysis.bugs:
-            print("Potential Bugs:")
+            add("Potential Bugs:")
             for bug in file_analysis.bugs:
-                print(f"  Line {bug.line}: [{bug.severity.value.upper()}] {bug.message}")
+                add(f"  Line {bug.line}: [{bug.severity.value.upper()}] {bug.message}")
         
-        complexity_metrics = file_analysis.complexity.get('function_metrics', [])
+        complexity_metrics = file_analysis.complexity.function_metrics
         if complexity_metrics:
-            print("Complexity Metrics:")
+            add("Complexity Metrics:")
             for metric in complexity_metrics:
                 warning = " ⚠️" if metric['ccn'] > options['max_complexity_threshold'] else ""
-                print(f"  {metric['name']} (line {metric['lineno']}): CCN = {metric['ccn']}{warning}")
+                add(f"  {metric['name']} (line {metric['lineno']}): CCN = {metric['ccn']}{warning}")
         
-        print()
+        add("")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
     
     return result
 
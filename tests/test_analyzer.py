@@ -67,10 +67,10 @@ def complex_function(x):
         result = self.analyzer.analyze_files(files)
         
         complexity = result.files[0].complexity
-        assert len(complexity['function_metrics']) > 0
+        assert len(complexity.function_metrics) > 0
         
         # Function should have high complexity
-        func_metric = complexity['function_metrics'][0]
+        func_metric = complexity.function_metrics[0]
         assert func_metric['name'] == 'complex_function'
         assert func_metric['ccn'] > 5  # Should be complex
     
@@ -116,6 +116,74 @@ def unsafe_function(user_input):
         bugs = result.files[0].bugs
         assert any("eval" in bug.message.lower() for bug in bugs)
         assert any(bug.severity == Severity.HIGH for bug in bugs)
+
+    def test_security_dynamic_code_calls(self):
+        """Test that compile() and __import__() calls are reported."""
+        code = """
+def load(source, name):
+    module = __import__(name)
+    return compile(source, name, "exec"), module
+"""
+        files = [{"path": "test.py", "language": "python", "content": code}]
+        result = self.analyzer.analyze_files(files)
+        
+        messages = [bug.message for bug in result.files[0].bugs if bug.category == "security"]
+        assert any("compile()" in message for message in messages)
+        assert any("__import__()" in message for message in messages)
+    
+    def test_security_ignores_comments_and_strings(self):
+        """Test that eval/exec mentioned outside a call are not reported."""
+        code = """
+def safe_function(text):
+    # never call eval( on user input
+    return "exec(" + text
+"""
+        files = [{"path": "test.py", "language": "python", "content": code}]
+        result = self.analyzer.analyze_files(files)
+        
+        bugs = result.files[0].bugs
+        assert not any(bug.category == "security" for bug in bugs)
+    
+    def test_unused_variable_detection(self):
+        """Test detection of variables that are assigned but never read."""
+        code = """
+def compute(value):
+    unused = value * 2
+    used = value + 1
+    return used
+"""
+        files = [{"path": "test.py", "language": "python", "content": code}]
+        result = self.analyzer.analyze_files(files)
+        
+        unused = [bug for bug in result.files[0].bugs if bug.category == "unused_variable"]
+        assert [bug.line for bug in unused] == [3]
+        assert "'unused'" in unused[0].message
+    
+    def test_unused_variable_ignores_reads_not_by_name(self):
+        """Test that annotations, attribute reads and augmented assignments are not reported."""
+        code = """
+from dataclasses import dataclass
+
+@dataclass
+class Record:
+    name: str
+    count: int = 0
+    label: str = "record"
+    tags = ()
+
+class Config:
+    debug = False
+
+def tally(items):
+    total = 0
+    for item in items:
+        total += 1
+    return Config.debug
+"""
+        files = [{"path": "test.py", "language": "python", "content": code}]
+        result = self.analyzer.analyze_files(files)
+        
+        assert not any(bug.category == "unused_variable" for bug in result.files[0].bugs)
     
     def test_syntax_error_handling(self):
         """Test handling of syntax errors."""
@@ -156,6 +224,165 @@ def broken_function(
         assert result.overall_metrics.files_analyzed == 2
         assert len(result.files) == 2
     
+    def test_parallel_matches_serial(self, monkeypatch):
+        """Test that pooled analysis of many files matches serial analysis."""
+        import pickle
+        from coderefinery import analyzer as analyzer_module
+        pools = []
+        
+        class RecordingPool:
+            """Runs the mapped payloads in-process after a pickle round-trip."""
+            def __init__(self, max_workers=None, mp_context=None):
+                pools.append(mp_context.get_start_method())
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc_info):
+                return False
+            
+            def map(self, fn, payloads, chunksize=1):
+                return [fn(pickle.loads(pickle.dumps(payload))) for payload in payloads]
+        
+        monkeypatch.setattr(analyzer_module, "ProcessPoolExecutor", RecordingPool)
+        monkeypatch.setattr(analyzer_module, "_available_cpus", lambda: 2)
+        files = [
+            {"path": f"module{i}.py", "language": "python",
+             "content": f"def func{i}(items=[]):\n    return eval(items)  # pooled\n"}
+            for i in range(6)
+        ]
+        
+        parallel = self.analyzer.analyze_files(files)
+        serial = [self.analyzer._analyze_single_file(f["path"], f["content"]) for f in files]
+        
+        assert pools and pools[0] != "fork"
+        assert [f.path for f in parallel.files] == [f["path"] for f in files]
+        assert parallel.files == serial
+        assert parallel.overall_metrics.files_analyzed == 6
+    
+    def test_parallel_skipped_on_one_cpu(self, monkeypatch):
+        """Test that no process pool is started when only one CPU is available."""
+        from coderefinery import analyzer as analyzer_module
+        
+        def no_pool(*args, **kwargs):
+            raise AssertionError("process pool started")
+        
+        monkeypatch.setattr(analyzer_module, "ProcessPoolExecutor", no_pool)
+        monkeypatch.setattr(analyzer_module, "_available_cpus", lambda: 1)
+        files = [
+            {"path": f"single{i}.py", "language": "python", "content": f"value{i} = {i}  # serial\n"}
+            for i in range(6)
+        ]
+        
+        result = self.analyzer.analyze_files(files)
+        
+        assert result.overall_metrics.files_analyzed == 6
+    
+    def test_bulk_tools_skipped_without_tools(self):
+        """Test that the batched tool pre-pass falls back when no tools exist."""
+        self.analyzer.tools_available = {"flake8": False, "black": False, "radon": False}
+        
+        outputs = self.analyzer._bulk_run_tools(["x = 1", "y = 2"])
+        
+        assert outputs == [{}, {}]
+    
+    def test_summarize_files(self):
+        """Test that merging per-file results matches a combined analysis."""
+        files = [
+            {"path": "a.py", "language": "python", "content": "def f(items=[]):\n    return eval(items)\n"},
+            {"path": "b.py", "language": "python", "content": "def g():\n    return 1\n"}
+        ]
+        options = {"export_formats": ["json"]}
+        
+        combined = self.analyzer.analyze_files(files, options)
+        per_file = [self.analyzer.analyze_files([f]).files[0] for f in files]
+        merged = self.analyzer.summarize_files(per_file, options)
+        
+        assert merged.files == combined.files
+        assert merged.overall_metrics == combined.overall_metrics
+        assert merged.summary == combined.summary
+        assert merged.export == combined.export
+
+    def test_has_changes_follows_snippets(self):
+        """Test that has_changes reflects the snippets of caller-built file analyses."""
+        from coderefinery.models import FileAnalysis
+        changed = FileAnalysis(path="a.py", language="python",
+                               before_snippet="x=1", after_snippet="x = 1")
+        unchanged = FileAnalysis(path="b.py", language="python",
+                                 before_snippet="x = 1", after_snippet="x = 1")
+
+        assert changed.has_changes
+        assert not unchanged.has_changes
+
+    def test_result_cache(self, tmp_path):
+        """Test that unchanged files are served from the result cache."""
+        files = [{"path": "cached.py", "language": "python", "content": "def f(items=[]): pass"}]
+        analyzer = CodeAnalyzer(cache_dir=str(tmp_path))
+        
+        first = analyzer.analyze_files(files)
+        first.files[0].bugs.clear()  # callers mutating results must not affect the cache
+        second = analyzer.analyze_files(files)
+        
+        assert any(bug.category == "mutable_default" for bug in second.files[0].bugs)
+        assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    def test_result_cache_write_failure(self, tmp_path, monkeypatch):
+        """Test that a failed disk cache write neither aborts analysis nor leaves temp files."""
+        import pickle
+        from coderefinery import analyzer as analyzer_module
+        
+        def fail_dump(obj, f):
+            raise pickle.PicklingError("cannot pickle")
+        
+        monkeypatch.setattr(analyzer_module.pickle, "dump", fail_dump)
+        files = [{"path": "uncached.py", "language": "python", "content": "value = 1  # write failure\n"}]
+        result = CodeAnalyzer(cache_dir=str(tmp_path)).analyze_files(files)
+        
+        assert result.overall_metrics.files_analyzed == 1
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_tool_steps_overlap(self, monkeypatch):
+        """Test that subprocess-backed steps run on threads and keep their keys."""
+        import threading
+        from coderefinery import analyzer as analyzer_module
+        monkeypatch.setattr(analyzer_module, "_available_cpus", lambda: 4)
+        self.analyzer.tools_available = {"flake8": True, "black": True, "radon": True}
+
+        steps = {tool: (lambda value: (value, threading.get_ident()), (tool,))
+                 for tool in ("flake8", "black", "radon")}
+        outputs = self.analyzer._run_tool_steps(steps)
+
+        assert [value for value, _ in outputs.values()] == ["flake8", "black", "radon"]
+        assert threading.get_ident() not in {ident for _, ident in outputs.values()}
+
+    def test_tool_detection_shared(self):
+        """Test that tool versions are probed once per process, not per analyzer."""
+        from coderefinery.analyzer import _detect_tools
+        hits = _detect_tools.cache_info().hits
+        
+        other = CodeAnalyzer()
+        
+        assert _detect_tools.cache_info().hits == hits + 1
+        assert other.tool_versions == self.analyzer.tool_versions
+    
+    def test_generate_patch(self):
+        """Test that patches keep original line numbers after trimming."""
+        original = "".join(f"line{i} = {i}\n" for i in range(20))
+        modified = original.replace("line10 = 10", "line10 = 100")
+
+        patch = self.analyzer._generate_patch(original, modified, "a.py")
+
+        assert patch.startswith("--- a/a.py\n+++ b/a.py\n@@ -8,7 +8,7 @@\n")
+        assert "-line10 = 10\n+line10 = 100\n" in patch
+
+    def test_extract_snippet_skips_bare_keyword_lines(self):
+        """Test that a line holding only 'def' and whitespace does not start the snippet."""
+        content = "x = 1\n" * 5 + "def   \n" + "y = 2\n" * 5 + "def real():\n" + "    pass\n" * 30
+
+        snippet = self.analyzer._extract_snippet(content)
+
+        assert snippet.startswith("def real():\n")
+
     def test_options_handling(self):
         """Test handling of analysis options."""
         code = "def test(): pass"
@@ -172,6 +399,17 @@ def broken_function(
         assert "markdown" in result.export
         assert "json" in result.export
         assert self.analyzer.max_complexity_threshold == 5
+        
+        # Serializing again reuses the file entries of the JSON export
+        serialized = self.analyzer._serialize_result(result)
+        assert serialized["files"] == self.analyzer._serialize_result(
+            self.analyzer.analyze_files(files)
+        )["files"]
+
+        # ...but not once the result holds different file analyses
+        other = {"path": "other.py", "language": "python", "content": "def other(): pass"}
+        result.files[0] = self.analyzer.analyze_files([other]).files[0]
+        assert self.analyzer._serialize_result(result)["files"][0]["path"] == "other.py"
 
 
 @pytest.fixture
@@ -224,7 +462,7 @@ def test_comprehensive_analysis(sample_code):
     
     # Should analyze complexity
     complexity = result.files[0].complexity
-    assert len(complexity['function_metrics']) >= 2  # At least 2 functions
+    assert len(complexity.function_metrics) >= 2  # At least 2 functions
     
     # Should have overall metrics
     assert result.overall_metrics.files_analyzed == 1
@@ -4,8 +4,9 @@ Test utilities module.
 import pytest
 from coderefinery.utils import (
     extract_functions, extract_classes, extract_imports,
+    extract_functions_map, extract_classes_map, extract_imports_map,
     get_code_metrics, validate_python_syntax, suggest_refactoring,
-    calculate_maintainability_index
+    calculate_maintainability_index, clear_parse_cache, dump_json, load_json, analyze
 )
 
 
@@ -24,21 +25,24 @@ def func_with_docstring():
     return True
 """
     
-    functions = extract_functions(code)
+    functions = extract_functions_map(code)
     assert len(functions) == 3
     
     # Check simple function
-    simple = next(f for f in functions if f['name'] == 'simple_func')
-    assert simple['args'] == []
+    simple = functions['simple_func']
+    assert simple['args'] == ()
     assert not simple['is_async']
+    assert simple.name == simple['name'] == 'simple_func'
+    with pytest.raises(KeyError):
+        simple['missing']
     
     # Check async function
-    async_f = next(f for f in functions if f['name'] == 'async_func')
-    assert async_f['args'] == ['param1', 'param2']
+    async_f = functions['async_func']
+    assert async_f['args'] == ('param1', 'param2')
     assert async_f['is_async']
     
     # Check function with docstring
-    with_doc = next(f for f in functions if f['name'] == 'func_with_docstring')
+    with_doc = functions['func_with_docstring']
     assert with_doc['docstring'] is not None
 
 
@@ -58,15 +62,15 @@ class ComplexClass(BaseClass):
         pass
 """
     
-    classes = extract_classes(code)
+    classes = extract_classes_map(code)
     assert len(classes) == 2
     
     # Check simple class
-    simple = next(c for c in classes if c['name'] == 'SimpleClass')
+    simple = classes['SimpleClass']
     assert len(simple['methods']) == 0
     
     # Check complex class
-    complex_c = next(c for c in classes if c['name'] == 'ComplexClass')
+    complex_c = classes['ComplexClass']
     assert len(complex_c['methods']) == 2
     assert complex_c['docstring'] is not None
 
@@ -82,18 +86,19 @@ from .local import helper
 """
     
     imports = extract_imports(code)
+    imports_map = extract_imports_map(code)
     
     # Check regular imports
     assert len(imports['imports']) == 2
-    os_import = next(i for i in imports['imports'] if i['module'] == 'os')
+    os_import = imports_map['imports']['os']
     assert os_import['alias'] is None
     
-    sys_import = next(i for i in imports['imports'] if i['module'] == 'sys')
+    sys_import = imports_map['imports']['sys']
     assert sys_import['alias'] == 'system'
     
     # Check from imports
     assert len(imports['from_imports']) == 4
-    path_import = next(i for i in imports['from_imports'] if i['name'] == 'Path')
+    path_import = imports_map['from_imports']['Path']
     assert path_import['module'] == 'pathlib'
 
 
@@ -120,19 +125,15 @@ x = 42
     assert 0 <= metrics['code_percentage'] <= 100
 
 
-def test_validate_python_syntax():
+@pytest.mark.parametrize("code,expected_valid", [
+    ("def test(): return True", True),
+    ("def test( return True", False),
+])
+def test_validate_python_syntax(code, expected_valid):
     """Test Python syntax validation."""
-    # Valid syntax
-    valid_code = "def test(): return True"
-    is_valid, error = validate_python_syntax(valid_code)
-    assert is_valid
-    assert error is None
-    
-    # Invalid syntax
-    invalid_code = "def test( return True"
-    is_valid, error = validate_python_syntax(invalid_code)
-    assert not is_valid
-    assert error is not None
+    is_valid, error = validate_python_syntax(code)
+    assert is_valid == expected_valid
+    assert (error is None) == expected_valid
 
 
 def test_suggest_refactoring():
@@ -158,6 +159,11 @@ class ClassWithoutDocstring:
     # Should suggest adding docstrings
     doc_suggestions = [s for s in suggestions if s['type'] == 'documentation']
     assert len(doc_suggestions) >= 2  # Function and class
+    
+    # Pre-extracted definitions give the same suggestions
+    assert suggest_refactoring(
+        code, functions=extract_functions(code), classes=extract_classes(code)
+    ) == suggestions
 
 
 def test_calculate_maintainability_index():
@@ -185,6 +191,18 @@ class WellStructuredClass:
     # Empty code
     empty_index = calculate_maintainability_index("")
     assert empty_index == 100.0
+    
+    # Precomputed counts give the same score as extracting them
+    functions = extract_functions(good_code)
+    classes = extract_classes(good_code)
+    assert calculate_maintainability_index(
+        good_code, functions_count=len(functions), classes_count=len(classes)
+    ) == index
+    
+    # Repeated calls are served from the cache
+    hits = calculate_maintainability_index.cache_info().hits
+    assert calculate_maintainability_index(good_code) == index
+    assert calculate_maintainability_index.cache_info().hits == hits + 1
 
 
 def test_extract_functions_with_syntax_error():
@@ -201,6 +219,73 @@ def test_extract_classes_with_syntax_error():
     assert len(classes) == 0
 
 
+def test_parse_cache_shared_between_helpers():
+    """Test that the helpers reuse one parse per content."""
+    from coderefinery.utils import _parse_cached
+    clear_parse_cache()
+    code = "class Widget:\n    def render(self): pass\n"
+    
+    extract_functions(code)
+    extract_classes(code)
+    assert validate_python_syntax(code) == (True, None)
+    
+    assert _parse_cached.cache_info().misses == 1
+    
+    clear_parse_cache()
+    assert _parse_cached.cache_info().currsize == 0
+
+
+def test_parse_cache_shares_syntax_errors():
+    """Test that invalid content is parsed once for validation and extraction."""
+    from coderefinery.utils import _parse_cached
+    clear_parse_cache()
+    code = "def broken(:\n    pass\n"
+    
+    is_valid, error = validate_python_syntax(code)
+    
+    assert not is_valid and error.startswith("Line 1:")
+    assert extract_functions(code) == []
+    assert extract_imports(code) == {'imports': [], 'from_imports': [], 'from_by_module': {}}
+    assert _parse_cached.cache_info().misses == 1
+
+
+def test_analyze():
+    """Test the combined summary against the individual helpers."""
+    from coderefinery.utils import _extract_all
+    code = "import os\n\nclass Widget:\n    def render(self): pass\n\ndef build(): pass\n"
+    clear_parse_cache()
+    
+    summary = analyze(code)
+    
+    assert _extract_all.cache_info().misses == 1
+    assert summary.functions == extract_functions(code)
+    assert summary.classes == extract_classes(code)
+    assert summary.imports == extract_imports(code)
+    assert summary.metrics == get_code_metrics(code)
+
+
+def test_dump_json():
+    """Test indented JSON output, with or without orjson installed."""
+    import json
+    data = {"files": [{"path": "a.py", "avg_ccn": 2.5, "patch": None}], "summary": "ok"}
+    
+    output = dump_json(data)
+    
+    assert json.loads(output) == data
+    assert output.startswith('{\n  "files": [\n    {\n      "path"')
+
+
+def test_load_json():
+    """Test JSON parsing and its error type, with or without orjson installed."""
+    import json
+    
+    assert load_json('{"files": [{"path": "a.py"}], "options": {}}') == {
+        "files": [{"path": "a.py"}], "options": {}
+    }
+    with pytest.raises(json.JSONDecodeError):
+        load_json('{"files": [')
+
+
 def test_complex_imports():
     """Test complex import scenarios."""
     code = """
@@ -218,10 +303,10 @@ import package.deeply.nested.module
     assert len(imports['from_imports']) >= 3
     
     # Check relative import
-    relative_import = next((i for i in imports['from_imports'] 
-                           if i['module'] == '..parent'), None)
-    assert relative_import is not None
-    assert relative_import['level'] == 2
+    relative_imports = imports['from_by_module'].get('..parent')
+    assert relative_imports is not None
+    assert relative_imports[0]['name'] == 'sibling'
+    assert relative_imports[0]['level'] == 2
 
 
 @pytest.mark.parametrize("code,expected_functions", [
@@ -234,4 +319,16 @@ import package.deeply.nested.module
 def test_function_extraction_parametrized(code, expected_functions):
     """Parametrized test for function extraction."""
     functions = extract_functions(code)
-    assert len(functions) == expected_functions
\ No newline at end of file
+    assert len(functions) == expected_functions
+
+
+def test_keyword_prefilter_skips_parse():
+    """Test that sources without the relevant keyword are not parsed."""
+    from coderefinery.utils import _parse_cached
+    clear_parse_cache()
+    code = "x = 42\n"
+    
+    assert extract_functions(code) == []
+    assert extract_classes(code) == []
+    assert extract_imports(code)['imports'] == []
+    assert _parse_cached.cache_info().misses == 0